@@ -0,0 +1,118 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from enum import Enum
+
+from fastapi import HTTPException, status
+from prometheus_client import Counter, Gauge, Histogram
+
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds",
+    "Time requests waited for a slot of their route class",
+    ["route_class"],
+)
+ADMISSION_SHED = Counter(
+    "admission_shed_total",
+    "Requests rejected with 503 because their route class was saturated",
+    ["route_class"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests holding a slot of their route class",
+    ["route_class"],
+)
+
+
+class RouteClasses(str, Enum):
+    # single node reads and writes
+    CHEAP = "cheap"
+    # paginated listings and searches
+    LIST = "list"
+    # requests that start heavy background work
+    BULK = "bulk"
+
+
+class AdmissionLimiter:
+    """Caps the concurrent requests of a route class.
+
+    At most `queue_size` requests wait for a slot, and none of them longer
+    than `max_wait` seconds, the others fail fast with 503 so a saturated
+    class can't hold the others up.
+    """
+
+    def __init__(
+        self,
+        route_class: RouteClasses,
+        concurrency: int,
+        queue_size: int,
+        max_wait: float,
+        retry_after: int = 1,
+    ):
+        self.route_class = route_class
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._waiting = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._semaphore.locked() and self._waiting >= self.queue_size:
+            self._shed()
+
+        self._waiting += 1
+        started_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self._shed()
+        finally:
+            self._waiting -= 1
+            ADMISSION_WAIT.labels(self.route_class.value).observe(
+                time.monotonic() - started_at
+            )
+
+        in_flight = ADMISSION_IN_FLIGHT.labels(self.route_class.value)
+        in_flight.inc()
+        try:
+            yield
+        finally:
+            in_flight.dec()
+            self._semaphore.release()
+
+    def _shed(self) -> None:
+        ADMISSION_SHED.labels(self.route_class.value).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+limiters = {
+    RouteClasses.CHEAP: AdmissionLimiter(
+        RouteClasses.CHEAP, concurrency=64, queue_size=128, max_wait=1
+    ),
+    RouteClasses.LIST: AdmissionLimiter(
+        RouteClasses.LIST, concurrency=16, queue_size=32, max_wait=2
+    ),
+    RouteClasses.BULK: AdmissionLimiter(
+        RouteClasses.BULK,
+        concurrency=4,
+        queue_size=8,
+        max_wait=2,
+        retry_after=5,
+    ),
+}
+
+
+def admit(route_class: RouteClasses) -> Callable:
+    """Dependency holding a slot of the route class for the request."""
+
+    async def dependency() -> AsyncIterator[None]:
+        async with limiters[route_class].slot():
+            yield
+
+    return dependency
@@ -0,0 +1,88 @@
+import asyncio
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from prometheus_client import Counter, Gauge
+
+BROADCAST_SUBSCRIBERS = Gauge(
+    "broadcast_subscribers", "Number of open broadcast subscriptions"
+)
+BROADCAST_SLOW_CONSUMERS = Counter(
+    "broadcast_slow_consumers_total",
+    "Subscriptions dropped because their queue was full",
+)
+
+# Put on the queue of a dropped subscription to end its iteration
+_CLOSED = object()
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    async def messages(
+        self, keepalive: float | None = None
+    ) -> AsyncIterator[dict[str, Any] | None]:
+        """Yields the published messages, and `None` every `keepalive`
+        seconds without one."""
+        while True:
+            try:
+                message = await asyncio.wait_for(self.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if message is _CLOSED:
+                return
+            yield message
+
+    def close(self) -> None:
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+
+class BroadcastHub:
+    """In-process fan-out of messages to the subscribers of a topic.
+
+    Publishing never waits, a subscriber that doesn't keep up with its topic
+    fills its bounded queue and gets dropped instead.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._topics: dict[str, set[Subscription]] = defaultdict(set)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._topics.get(topic))
+
+    def publish(self, topic: str, message: dict[str, Any]) -> None:
+        for subscription in list(self._topics.get(topic, ())):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                BROADCAST_SLOW_CONSUMERS.inc()
+                self._unsubscribe(topic, subscription)
+                subscription.close()
+
+    @asynccontextmanager
+    async def subscribe(self, topic: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(self.queue_size)
+        self._topics[topic].add(subscription)
+        BROADCAST_SUBSCRIBERS.inc()
+        try:
+            yield subscription
+        finally:
+            self._unsubscribe(topic, subscription)
+
+    def _unsubscribe(self, topic: str, subscription: Subscription) -> None:
+        subscribers = self._topics.get(topic)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        BROADCAST_SUBSCRIBERS.dec()
+        if not subscribers:
+            del self._topics[topic]
@@ -0,0 +1,29 @@
+import re
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveCompressionMiddleware:
+    """Wraps a compression middleware and bypasses it for the paths matching
+    `exclude`.
+
+    Compressors buffer their output until a block fills up, which would
+    hold back the small chunks of an event stream and its keepalives.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        compressor: type,
+        exclude: re.Pattern,
+        **options,
+    ):
+        self.app = app
+        self.compressed_app = compressor(app, **options)
+        self.exclude = exclude
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and not self.exclude.search(scope["path"]):
+            await self.compressed_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
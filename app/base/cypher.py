@@ -0,0 +1,30 @@
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic.json import custom_pydantic_encoder
+
+PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+
+def to_cypher_params(
+    model: BaseModel, exclude: set[str] | None = None
+) -> dict[str, Any]:
+    """Same values as `json.loads(model.json())` for a flat model, without
+    encoding and decoding the JSON."""
+    encoders = model.__config__.json_encoders
+    return {
+        name: _encode(getattr(model, name), encoders)
+        for name in model.__fields__
+        if not exclude or name not in exclude
+    }
+
+
+def _encode(value: Any, encoders: dict) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, PRIMITIVE_TYPES):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, encoders) for item in value]
+    return custom_pydantic_encoder(encoders, value)
@@ -0,0 +1,28 @@
+from collections.abc import Iterable
+
+from fastapi import HTTPException, status
+
+
+def parse_fields(
+    fields: str | None, allowed: Iterable[str]
+) -> set[str] | None:
+    """Parses a comma separated `fields=` query parameter, `None` stands for
+    all of the fields."""
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if unknown := requested - set(allowed):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return requested
+
+
+def map_projection(variable: str, properties: Iterable[str]) -> str:
+    """RETURN item fetching only the given properties of a node.
+
+    The properties are interpolated, they must come from `parse_fields`.
+    """
+    selectors = ", ".join(f".{name}" for name in sorted(properties))
+    return f"{variable}{{{selectors}}} AS {variable}"
@@ -0,0 +1,117 @@
+from collections.abc import MutableMapping
+from itertools import cycle
+from typing import Any, Callable
+
+from fastapi import Request
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncGraphDatabase, Bookmarks
+from pydantic import BaseSettings
+
+from app.core.settings import settings
+
+# Key of the causal bookmarks in the client's session cookie
+BOOKMARKS_SESSION_KEY = "neo4j_bookmarks"
+
+
+class RoutingSettings(BaseSettings):
+    # JSON list of bolt URIs, the reads stay on the leader when it is empty
+    NEO4J_READ_REPLICA_URIS: list[str] = []
+
+
+routing_settings = RoutingSettings()
+
+
+class Neo4jRouter:
+    """Sends the writes to the leader and spreads the reads over the read
+    replicas, falling back to the leader when there is none."""
+
+    def __init__(self, leader, replicas: list | None = None):
+        self.leader = leader
+        self.replicas = replicas or []
+        self._replicas_cycle = cycle(self.replicas)
+
+    @classmethod
+    def from_settings(cls) -> "Neo4jRouter":
+        auth = (settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+        return cls(
+            leader=AsyncGraphDatabase.driver(settings.NEO4J_URI, auth=auth),
+            replicas=[
+                AsyncGraphDatabase.driver(uri, auth=auth)
+                for uri in routing_settings.NEO4J_READ_REPLICA_URIS
+            ],
+        )
+
+    def reader(self):
+        if not self.replicas:
+            return self.leader
+        return next(self._replicas_cycle)
+
+    def writer(self):
+        return self.leader
+
+    async def close(self) -> None:
+        for driver in [self.leader, *self.replicas]:
+            await driver.close()
+
+
+class RoutedNeo4jSession:
+    """Drop-in for the request's Neo4j session that routes every
+    transaction on its own.
+
+    The bookmarks of the last write are kept in `state`, the client's
+    session, and every later transaction waits for them, so a client always
+    reads its own writes even from a replica that lags behind.
+    """
+
+    def __init__(self, router: Neo4jRouter, state: MutableMapping):
+        self.router = router
+        self.state = state
+
+    @property
+    def bookmarks(self) -> Bookmarks:
+        return Bookmarks.from_raw_values(
+            self.state.get(BOOKMARKS_SESSION_KEY, [])
+        )
+
+    async def read_transaction(
+        self, transaction_function: Callable, *args: Any, **kwargs: Any
+    ) -> Any:
+        async with self.router.reader().session(
+            default_access_mode=READ_ACCESS, bookmarks=self.bookmarks
+        ) as session:
+            return await session.read_transaction(
+                transaction_function, *args, **kwargs
+            )
+
+    async def write_transaction(
+        self, transaction_function: Callable, *args: Any, **kwargs: Any
+    ) -> Any:
+        async with self.router.writer().session(
+            default_access_mode=WRITE_ACCESS, bookmarks=self.bookmarks
+        ) as session:
+            result = await session.write_transaction(
+                transaction_function, *args, **kwargs
+            )
+            bookmarks = await session.last_bookmarks()
+        self.state[BOOKMARKS_SESSION_KEY] = sorted(bookmarks.raw_values)
+        return result
+
+
+_router: Neo4jRouter | None = None
+
+
+def get_router() -> Neo4jRouter:
+    global _router
+    if _router is None:
+        _router = Neo4jRouter.from_settings()
+    return _router
+
+
+async def close_router() -> None:
+    global _router
+    if _router is not None:
+        await _router.close()
+        _router = None
+
+
+def get_routed_neo4j_database(request: Request) -> RoutedNeo4jSession:
+    return RoutedNeo4jSession(get_router(), request.session)
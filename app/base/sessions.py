@@ -0,0 +1,18 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from neo4j import WRITE_ACCESS
+
+from app.apps.base.routing import get_router
+
+
+# Background jobs outlive the request that scheduled them, so they can not
+# reuse the request-scoped session and have to open their own one. It comes
+# from the router's leader driver, so the process keeps a single connection
+# pool to the leader.
+@asynccontextmanager
+async def neo4j_session() -> AsyncIterator:
+    async with get_router().writer().session(
+        default_access_mode=WRITE_ACCESS
+    ) as session:
+        yield session
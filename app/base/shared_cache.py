@@ -0,0 +1,222 @@
+import asyncio
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+
+# tmpfs, so the mapped file never hits the disk
+SHARED_MEMORY_DIRECTORY = (
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+
+# generation
+HEADER = struct.Struct("<Q")
+# key hash, generation, written at, refreshing until, value length
+SLOT_HEADER = struct.Struct("<QQddI")
+
+# How often the workers waiting for another one to fill a slot look again
+FILL_POLL_INTERVAL = 0.05
+
+
+class SharedCache:
+    """Cache shared by the worker processes of the host through a memory
+    mapped file.
+
+    Keys hash into a fixed number of slots, a newer key simply takes the
+    slot over. `invalidate` bumps the generation, which turns every entry
+    stale at once. A stale entry keeps being served for `stale_for` seconds
+    while the single worker holding its refresh lease recomputes it. On a
+    miss the lease is taken as well, and the other workers wait up to
+    `fill_wait` seconds for its result instead of all computing it at once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        slots: int = 64,
+        slot_size: int = 256 * 1024,
+        fresh_for: float = 5,
+        stale_for: float = 30,
+        refresh_lease: float = 10,
+        fill_wait: float = 2,
+    ):
+        self.path = os.path.join(SHARED_MEMORY_DIRECTORY, name)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.refresh_lease = refresh_lease
+        self.fill_wait = fill_wait
+
+        self._fd: int | None = None
+        self._map: mmap.mmap | None = None
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        deadline = time.monotonic() + self.fill_wait
+        while True:
+            value, refresh = self.lookup(key)
+            if refresh:
+                break
+            if value is not None:
+                return value
+            # Another worker fills the slot; if it is too slow or died,
+            # compute the value here rather than keep the request waiting
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(FILL_POLL_INTERVAL)
+
+        # Read before computing, so an invalidation meanwhile leaves the new
+        # value stale
+        generation = self.generation()
+        try:
+            value = await compute()
+        except BaseException:
+            # Nobody else should wait for a value that isn't coming
+            self.release(key)
+            raise
+        self.store(key, value, generation)
+        return value
+
+    def lookup(self, key: str) -> tuple[bytes | None, bool]:
+        """Returns the cached value, and whether the caller has to refresh
+        it.
+
+        `(None, False)` means another worker holds the lease of the missing
+        value and is computing it.
+        """
+        key_hash = self._hash(key)
+        offset = self._slot_offset(key_hash)
+        now = time.time()
+        with self._locked() as shared:
+            (generation,) = HEADER.unpack_from(shared, 0)
+            (
+                slot_hash,
+                slot_generation,
+                written_at,
+                refreshing_until,
+                length,
+            ) = SLOT_HEADER.unpack_from(shared, offset)
+            if (
+                slot_hash != key_hash
+                or length == 0
+                or now - written_at > self.fresh_for + self.stale_for
+            ):
+                if slot_hash == key_hash and refreshing_until > now:
+                    return None, False
+                SLOT_HEADER.pack_into(
+                    shared,
+                    offset,
+                    key_hash,
+                    slot_generation,
+                    0.0,
+                    now + self.refresh_lease,
+                    0,
+                )
+                return None, True
+
+            start = offset + SLOT_HEADER.size
+            value = bytes(shared[start : start + length])
+            if slot_generation == generation and (
+                now - written_at <= self.fresh_for
+            ):
+                return value, False
+            if refreshing_until > now:
+                return value, False
+
+            SLOT_HEADER.pack_into(
+                shared,
+                offset,
+                slot_hash,
+                slot_generation,
+                written_at,
+                now + self.refresh_lease,
+                length,
+            )
+            return value, True
+
+    def store(self, key: str, value: bytes, generation: int) -> None:
+        if len(value) > self.slot_size - SLOT_HEADER.size:
+            self.release(key)
+            return
+        key_hash = self._hash(key)
+        offset = self._slot_offset(key_hash)
+        with self._locked() as shared:
+            start = offset + SLOT_HEADER.size
+            shared[start : start + len(value)] = value
+            SLOT_HEADER.pack_into(
+                shared,
+                offset,
+                key_hash,
+                generation,
+                time.time(),
+                0.0,
+                len(value),
+            )
+
+    def release(self, key: str) -> None:
+        """Drops the refresh lease of the key, keeping whatever value the
+        slot holds."""
+        key_hash = self._hash(key)
+        offset = self._slot_offset(key_hash)
+        with self._locked() as shared:
+            header = SLOT_HEADER.unpack_from(shared, offset)
+            slot_hash, slot_generation, written_at, _, length = header
+            if slot_hash == key_hash:
+                SLOT_HEADER.pack_into(
+                    shared,
+                    offset,
+                    slot_hash,
+                    slot_generation,
+                    written_at,
+                    0.0,
+                    length,
+                )
+
+    def generation(self) -> int:
+        with self._locked() as shared:
+            return HEADER.unpack_from(shared, 0)[0]
+
+    def invalidate(self) -> None:
+        with self._locked() as shared:
+            (generation,) = HEADER.unpack_from(shared, 0)
+            HEADER.pack_into(shared, 0, generation + 1)
+
+    @contextmanager
+    def _locked(self) -> Iterator[mmap.mmap]:
+        shared = self._open()
+        assert self._fd is not None
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield shared
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _open(self) -> mmap.mmap:
+        if self._map is None:
+            size = HEADER.size + self.slots * self.slot_size
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, size)
+        return self._map
+
+    def _slot_offset(self, key_hash: int) -> int:
+        return HEADER.size + (key_hash % self.slots) * self.slot_size
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        # 0 marks an empty slot
+        return int.from_bytes(digest, "little") or 1
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+TASK_QUEUE_DEPTH = Gauge(
+    "task_queue_depth", "Number of tasks waiting in the background queue"
+)
+TASK_LATENCY = Histogram(
+    "task_queue_latency_seconds",
+    "Time from submitting a background task until it is finished",
+    ["task"],
+)
+TASK_FAILURES = Counter(
+    "task_queue_failures_total",
+    "Background tasks that failed after all of their retries",
+    ["task"],
+)
+TASK_DROPS = Counter(
+    "task_queue_drops_total",
+    "Background tasks dropped because the queue was full",
+    ["task"],
+)
+
+Task = Callable[..., Awaitable[Any]]
+
+
+class TaskQueue:
+    """In-process queue for side effects that don't belong in the request.
+
+    Tasks are retried with exponential backoff, so they should be safe to
+    run more than once.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        max_size: int = 10_000,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+        drain_timeout: float = 30,
+    ):
+        self.concurrency = concurrency
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.drain_timeout = drain_timeout
+
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._timers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self.concurrency)
+        ]
+
+    async def drain(self) -> None:
+        """Waits for the queued tasks to finish, then stops the workers."""
+        if self._queue is None:
+            return
+        for timer in self._timers:
+            timer.cancel()
+        await asyncio.gather(*self._timers, return_exceptions=True)
+        self._timers = []
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Task queue was not drained, %d tasks are lost",
+                self._queue.qsize(),
+            )
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def submit(self, task: Task, *args: Any) -> bool:
+        """Queues the task, returns whether it was queued or dropped."""
+        if self._queue is None:
+            raise RuntimeError("Task queue is not running")
+        try:
+            self._queue.put_nowait((task, args, time.monotonic()))
+        except asyncio.QueueFull:
+            logger.warning("Task queue is full, dropping %s", task.__name__)
+            TASK_DROPS.labels(task.__name__).inc()
+            return False
+        TASK_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def every(self, interval: float, task: Task, *args: Any) -> None:
+        """Submits the task every `interval` seconds until the drain."""
+
+        async def timer() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                self.submit(task, *args)
+
+        self._timers.append(asyncio.create_task(timer()))
+
+    async def _work(self) -> None:
+        assert self._queue is not None
+        while True:
+            task, args, submitted_at = await self._queue.get()
+            TASK_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await self._run(task, args)
+            finally:
+                TASK_LATENCY.labels(task.__name__).observe(
+                    time.monotonic() - submitted_at
+                )
+                self._queue.task_done()
+
+    async def _run(self, task: Task, args: tuple) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await task(*args)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt == self.max_retries:
+                    logger.exception("Task %s failed", task.__name__)
+                    TASK_FAILURES.labels(task.__name__).inc()
+                    return
+                await asyncio.sleep(self.retry_delay * 2**attempt)
+
+
+task_queue = TaskQueue()
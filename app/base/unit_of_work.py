@@ -0,0 +1,138 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, MutableMapping
+from typing import Any, Callable, TypeVar
+
+from fastapi import Request
+from neo4j import WRITE_ACCESS, Bookmarks
+from neo4j.exceptions import TransientError
+
+from app.apps.base.routing import BOOKMARKS_SESSION_KEY, get_router
+
+T = TypeVar("T")
+
+
+class UnitOfWork:
+    """Runs all the statements of a request in one leader transaction.
+
+    Has the read_transaction/write_transaction interface of a session, so
+    the repositories can share it without changes. Nothing is visible to
+    others before `commit`, side effects that depend on the data being
+    there are deferred with `after_commit`.
+
+    Endpoints run their work through `run`, which commits before the
+    response is built.
+    """
+
+    def __init__(
+        self,
+        session,
+        state: MutableMapping,
+        max_retries: int = 3,
+        retry_delay: float = 0.1,
+    ):
+        self.session = session
+        self.state = state
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._transaction = None
+        # A transaction runs one statement at a time
+        self._lock = asyncio.Lock()
+        self._after_commit: list[tuple[Callable, tuple]] = []
+
+    async def read_transaction(
+        self, transaction_function: Callable, *args: Any, **kwargs: Any
+    ) -> Any:
+        async with self._lock:
+            if self._transaction is None:
+                self._transaction = await self.session.begin_transaction()
+            return await transaction_function(
+                self._transaction, *args, **kwargs
+            )
+
+    write_transaction = read_transaction
+
+    def after_commit(self, callback: Callable, *args: Any) -> None:
+        self._after_commit.append((callback, args))
+
+    async def run(self, work: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """Runs `work` in the transaction and commits it.
+
+        The session only retries a single transaction function, so on a
+        transient error (deadlock, leader switch) the whole unit is rolled
+        back and `work` runs again from the start, dropping the side
+        effects deferred by the failed attempt.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await work(*args)
+                await self.commit()
+                return result
+            except TransientError:
+                await self.rollback()
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self.retry_delay * 2**attempt)
+            except BaseException:
+                await self.rollback()
+                raise
+
+    async def commit(self) -> None:
+        # Waits for a statement still running on the transaction
+        async with self._lock:
+            if self._transaction is not None:
+                await self._transaction.commit()
+                self._transaction = None
+                # Lets the client's next requests read what it just wrote
+                self.state[BOOKMARKS_SESSION_KEY] = sorted(
+                    (await self.session.last_bookmarks()).raw_values
+                )
+            for callback, args in self._after_commit:
+                callback(*args)
+            self._after_commit = []
+
+    async def rollback(self) -> None:
+        async with self._lock:
+            if self._transaction is not None:
+                # Also closes a transaction the server has already failed
+                await self._transaction.close()
+                self._transaction = None
+            self._after_commit = []
+
+
+async def gather(*awaitables: Awaitable) -> list:
+    """`asyncio.gather` that cancels and awaits the other awaitables when
+    one of them fails, so none of their statements outlives the attempt
+    and runs after its rollback."""
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def after_commit(neo4j_db, callback: Callable, *args: Any) -> None:
+    """Defers the callback until the unit of work commits, runs it right
+    away on a plain session."""
+    if isinstance(neo4j_db, UnitOfWork):
+        neo4j_db.after_commit(callback, *args)
+    else:
+        callback(*args)
+
+
+async def get_unit_of_work(request: Request) -> AsyncIterator[UnitOfWork]:
+    bookmarks = Bookmarks.from_raw_values(
+        request.session.get(BOOKMARKS_SESSION_KEY, [])
+    )
+    async with get_router().writer().session(
+        default_access_mode=WRITE_ACCESS, bookmarks=bookmarks
+    ) as session:
+        unit_of_work = UnitOfWork(session, request.session)
+        try:
+            yield unit_of_work
+        finally:
+            # The teardown can run after the response went out, so committing
+            # here would be too late; whatever `run` left open is dropped
+            await unit_of_work.rollback()
@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from motor.core import AgnosticDatabase
 from pydantic import parse_obj_as
 
+from app.apps.base.admission import RouteClasses, admit
+from app.apps.base.routing import get_routed_neo4j_database
+from app.apps.base.unit_of_work import get_unit_of_work
 from app.apps.feed.repository.comment import CommentRepository
 from app.apps.feed.schemas.comment import (
     CommentInput,
     CommentOutput,
     CommentsListParams,
+    CommentsSearchParams,
     PaginatedComments,
+    SearchedComments,
 )
 from app.core import depends
 from app.core.depends import UserRole
@@ -17,43 +23,80 @@ from app.schemas.users import User
 router = APIRouter()
 
 
-@router.post("", response_model=CommentOutput)
+@router.post(
+    "",
+    response_model=CommentOutput,
+    dependencies=[Depends(admit(RouteClasses.CHEAP))],
+)
 async def create_comment_api(
     comment_input: CommentInput,
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_unit_of_work),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    return await CommentRepository(
+    repository = CommentRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).create_comment(comment_input)
+    )
+    return await neo4j_db.run(repository.create_comment, comment_input)
 
 
-@router.get("", response_model=PaginatedComments)
+@router.get(
+    "",
+    response_model=PaginatedComments,
+    dependencies=[Depends(admit(RouteClasses.LIST))],
+)
 async def list_comments_api(
     params: CommentsListParams = Depends(),
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_routed_neo4j_database),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    return await CommentRepository(
+    comments = await CommentRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
     ).list_comments(params)
 
+    # Projected comments don't fit the response model
+    if params.fields is not None:
+        return JSONResponse(content=jsonable_encoder(comments))
+
+    return comments
 
-@router.delete("/{comment_id}")
+
+@router.get(
+    "/search",
+    response_model=SearchedComments,
+    dependencies=[Depends(admit(RouteClasses.LIST))],
+)
+async def search_comments_api(
+    params: CommentsSearchParams = Depends(),
+    mongo_db: AgnosticDatabase = Depends(depends.get_database),
+    neo4j_db=Depends(get_routed_neo4j_database),
+    current_user: User = Depends(
+        depends.permissions([UserRole.AUTHENTICATED])
+    ),
+):
+    return await CommentRepository(
+        mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
+    ).search_comments(params)
+
+
+@router.delete(
+    "/{comment_id}",
+    dependencies=[Depends(admit(RouteClasses.CHEAP))],
+)
 async def delete_comment_api(
     comment_id: int,
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_unit_of_work),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    await CommentRepository(
+    repository = CommentRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).delete_comment(comment_id)
+    )
+    await neo4j_db.run(repository.delete_comment, comment_id)
@@ -1,14 +1,24 @@
+import json
+
 from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from motor.core import AgnosticDatabase
 from pydantic import parse_obj_as
 
+from app.apps.base.admission import RouteClasses, admit
+from app.apps.base.routing import get_routed_neo4j_database
+from app.apps.base.unit_of_work import get_unit_of_work
+from app.apps.feed.cache import feed_cache, feed_page_key
+from app.apps.feed.events import post_event_stream
 from app.apps.feed.repository.post import PostRepository
 from app.apps.feed.schemas.post import (
     PaginatedPosts,
     PostInput,
     PostOutput,
     PostsListParams,
+    PostsSearchParams,
+    SearchedPosts,
 )
 from app.core import depends
 from app.core.depends import UserRole
@@ -17,69 +27,170 @@ from app.schemas.users import User
 router = APIRouter()
 
 
-@router.post("", response_model=PostOutput)
+@router.post(
+    "",
+    response_model=PostOutput,
+    dependencies=[Depends(admit(RouteClasses.CHEAP))],
+)
 async def create_post_api(
     post_input: PostInput,
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_unit_of_work),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    post = await PostRepository(
+    repository = PostRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).create_post(post_input)
+    )
+    post = await neo4j_db.run(repository.create_post, post_input)
     return parse_obj_as(PostOutput, post)
 
 
-@router.get("", response_model=PaginatedPosts)
+@router.get(
+    "",
+    response_model=PaginatedPosts,
+    dependencies=[Depends(admit(RouteClasses.LIST))],
+)
 async def list_posts_api(
     params: PostsListParams = Depends(),
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_routed_neo4j_database),
+    current_user: User = Depends(
+        depends.permissions([UserRole.AUTHENTICATED])
+    ),
+):
+    repository = PostRepository(
+        mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
+    )
+
+    # The top pages are the same for everyone, they are shared between the
+    # workers as rendered JSON
+    if (cache_key := feed_page_key(params)) is not None:
+
+        async def render_page() -> bytes:
+            posts = await repository.list_posts(params)
+            return json.dumps(jsonable_encoder(posts)).encode()
+
+        return Response(
+            content=await feed_cache.get_or_compute(cache_key, render_page),
+            media_type="application/json",
+        )
+
+    posts = await repository.list_posts(params)
+
+    # Projected posts don't fit the response model
+    if params.fields is not None:
+        return JSONResponse(content=jsonable_encoder(posts))
+
+    return posts
+
+
+@router.get(
+    "/search",
+    response_model=SearchedPosts,
+    dependencies=[Depends(admit(RouteClasses.LIST))],
+)
+async def search_posts_api(
+    params: PostsSearchParams = Depends(),
+    mongo_db: AgnosticDatabase = Depends(depends.get_database),
+    neo4j_db=Depends(get_routed_neo4j_database),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
     return await PostRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).list_posts(params)
+    ).search_posts(params)
+
+
+@router.post(
+    "/user-info/refresh",
+    status_code=202,
+    dependencies=[Depends(admit(RouteClasses.BULK))],
+)
+async def refresh_user_info_api(
+    mongo_db: AgnosticDatabase = Depends(depends.get_database),
+    neo4j_db=Depends(get_routed_neo4j_database),
+    current_user: User = Depends(
+        depends.permissions([UserRole.AUTHENTICATED])
+    ),
+):
+    await PostRepository(
+        mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
+    ).refresh_user_info()
 
 
-@router.get("/{post_id}", response_model=PostOutput)
+@router.get(
+    "/{post_id}",
+    response_model=PostOutput,
+    dependencies=[Depends(admit(RouteClasses.CHEAP))],
+)
 async def get_post_api(
     post_id: int,
+    fields: str | None = None,
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_routed_neo4j_database),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
     post = await PostRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).get_post(post_id)
+    ).get_post(post_id, fields)
 
     if not post:  # Handle the case where post is None or empty
         return JSONResponse(
             status_code=404, content={"message": "Post not found"}
         )
 
+    if fields is not None:
+        return JSONResponse(content=jsonable_encoder(post))
+
     return parse_obj_as(PostOutput, post)
 
 
-@router.put("/{post_id}", response_model=PostOutput)
+@router.get("/{post_id}/stream")
+async def stream_post_api(
+    post_id: int,
+    mongo_db: AgnosticDatabase = Depends(depends.get_database),
+    neo4j_db=Depends(get_routed_neo4j_database),
+    current_user: User = Depends(
+        depends.permissions([UserRole.AUTHENTICATED])
+    ),
+):
+    post = await PostRepository(
+        mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
+    ).get_post(post_id)
+
+    if not post:
+        return JSONResponse(
+            status_code=404, content={"message": "Post not found"}
+        )
+
+    return StreamingResponse(
+        post_event_stream(post_id), media_type="text/event-stream"
+    )
+
+
+@router.put(
+    "/{post_id}",
+    response_model=PostOutput,
+    dependencies=[Depends(admit(RouteClasses.CHEAP))],
+)
 async def update_post_api(
     post_id: int,
     post_input: PostInput,
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_unit_of_work),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    post = await PostRepository(
+    repository = PostRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).update_post(post_id, post_input)
+    )
+    post = await neo4j_db.run(repository.update_post, post_id, post_input)
     if not post:  # Handle the case where post is None or empty
         return JSONResponse(
             status_code=404, content={"message": "Post not found"}
@@ -88,47 +199,62 @@ async def update_post_api(
     return parse_obj_as(PostOutput, post)
 
 
-@router.delete("/{post_id}", status_code=204)
+@router.delete(
+    "/{post_id}",
+    status_code=204,
+    dependencies=[Depends(admit(RouteClasses.BULK))],
+)
 async def delete_post_api(
     post_id: int,
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_unit_of_work),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    await PostRepository(
+    repository = PostRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).delete_post(post_id)
+    )
+    await neo4j_db.run(repository.delete_post, post_id)
 
 
-@router.post("/{post_id}/like", status_code=204)
+@router.post(
+    "/{post_id}/like",
+    status_code=204,
+    dependencies=[Depends(admit(RouteClasses.CHEAP))],
+)
 async def like_post_api(
     post_id: int,
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_unit_of_work),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    await PostRepository(
+    repository = PostRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).like_post(post_id)
+    )
+    await neo4j_db.run(repository.like_post, post_id)
 
 
-@router.post("/{post_id}/vote", response_model=PostOutput)
+@router.post(
+    "/{post_id}/vote",
+    response_model=PostOutput,
+    dependencies=[Depends(admit(RouteClasses.CHEAP))],
+)
 async def vote_post_api(
     post_id: int,
     vote_ids: list[str],
     mongo_db: AgnosticDatabase = Depends(depends.get_database),
-    neo4j_db=Depends(depends.get_neo4j_database),
+    neo4j_db=Depends(get_unit_of_work),
     current_user: User = Depends(
         depends.permissions([UserRole.AUTHENTICATED])
     ),
 ):
-    post = await PostRepository(
+    repository = PostRepository(
         mongo_db=mongo_db, neo4j_db=neo4j_db, user=current_user
-    ).vote_post(post_id, vote_ids)
+    )
+    post = await neo4j_db.run(repository.vote_post, post_id, vote_ids)
 
     if not post:
         return JSONResponse(
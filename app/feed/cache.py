@@ -0,0 +1,22 @@
+from app.apps.base.shared_cache import SharedCache
+from app.apps.feed.schemas.post import PostsListParams
+
+# Feed pages from the top that are shared between the workers
+FEED_CACHE_PAGES = 3
+# Larger pages would hardly ever fit a slot of the cache
+FEED_CACHE_MAX_LIMIT = 100
+
+feed_cache = SharedCache("mini-social-feed")
+
+
+def feed_page_key(params: PostsListParams) -> str | None:
+    """Cache key of a feed page, `None` when it isn't cached."""
+    if (
+        params.tag is not None
+        or params.fields is not None
+        or params.limit > FEED_CACHE_MAX_LIMIT
+        or params.offset >= FEED_CACHE_PAGES * params.limit
+    ):
+        return None
+    return f"posts:{params.sort.value}:{params.offset}:{params.limit}"
+
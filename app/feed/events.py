@@ -0,0 +1,48 @@
+import json
+from collections.abc import AsyncIterator
+from enum import Enum
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+
+from app.apps.base.broadcast import BroadcastHub
+
+STREAM_KEEPALIVE = 15
+
+hub = BroadcastHub()
+
+
+class PostEvents(str, Enum):
+    COMMENT_CREATED = "comment_created"
+    COMMENT_DELETED = "comment_deleted"
+    COUNTERS_CHANGED = "counters_changed"
+    POLL_TALLIES_CHANGED = "poll_tallies_changed"
+    POST_DELETED = "post_deleted"
+
+
+def post_topic(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def has_post_subscribers(post_id: int) -> bool:
+    return hub.has_subscribers(post_topic(post_id))
+
+
+def publish_post_event(post_id: int, event: PostEvents, data: Any) -> None:
+    hub.publish(
+        post_topic(post_id),
+        {"event": event.value, "data": jsonable_encoder(data)},
+    )
+
+
+async def post_event_stream(post_id: int) -> AsyncIterator[str]:
+    """Server-sent events of a single post."""
+    async with hub.subscribe(post_topic(post_id)) as subscription:
+        async for message in subscription.messages(STREAM_KEEPALIVE):
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            yield (
+                f"event: {message['event']}\n"
+                f"data: {json.dumps(message['data'])}\n\n"
+            )
@@ -0,0 +1,58 @@
+from app.apps.base.sessions import neo4j_session
+from app.apps.feed.events import PostEvents, publish_post_event
+from app.apps.feed.ranking import hot_ranking
+from app.core.neo4j import Base
+
+
+class PostCountersJob(Base):
+    """Recounts the denormalized counters of a post from its edges.
+
+    Recounting instead of incrementing keeps the job safe to retry. The
+    patterns leave the far node unlabeled, so the counts come from the
+    node's degree store instead of expanding every edge.
+    """
+
+    def __init__(self, neo4j_db):
+        super().__init__(neo4j_db)
+        self.neo4j_db = neo4j_db
+
+    async def run(self, post_id: int) -> None:
+        cypher = """
+        MATCH (p:POST)
+        WHERE ID(p) = $post_id AND p.deleted_at IS NULL
+        SET
+        p.likes_count = COUNT { (p)<-[:LIKE]-() },
+        p.comments_count = COUNT { (p)<-[:BELONGS_TO]-() }
+        RETURN
+        p.created_at AS created_at,
+        p.likes_count AS likes_count,
+        p.comments_count AS comments_count,
+        COUNT { (p)<-[:VOTED]-() } AS votes_count
+        """
+        result = await self.neo4j_db.write_transaction(
+            self.neo4j_executor, cypher, {"post_id": post_id}
+        )
+        if not result:
+            return
+
+        counters = result[0]
+        hot_ranking.observe(
+            post_id,
+            created_at=counters["created_at"],
+            likes_count=counters["likes_count"],
+            comments_count=counters["comments_count"],
+            votes_count=counters["votes_count"],
+        )
+        publish_post_event(
+            post_id,
+            PostEvents.COUNTERS_CHANGED,
+            {
+                "likes_count": counters["likes_count"],
+                "comments_count": counters["comments_count"],
+            },
+        )
+
+
+async def refresh_post_counters(post_id: int) -> None:
+    async with neo4j_session() as neo4j_db:
+        await PostCountersJob(neo4j_db).run(post_id)
@@ -0,0 +1,75 @@
+from app.apps.base.sessions import neo4j_session
+from app.apps.feed.repository.statements import CLOSES_AT_EXPRESSION
+from app.core.date import utcnow
+from app.core.neo4j import Base
+
+POLLS_BATCH_SIZE = 500
+POLLS_CLOSE_INTERVAL = 60
+
+
+class PollClosingJob(Base):
+    """Closes the expired polls and freezes their results on the POLL node,
+    together with the option titles they were counted for."""
+
+    def __init__(self, neo4j_db, batch_size: int = POLLS_BATCH_SIZE):
+        super().__init__(neo4j_db)
+        self.neo4j_db = neo4j_db
+        self.batch_size = batch_size
+
+    async def run(self) -> None:
+        cypher = """
+        MATCH (p:POST:POLL)
+        WHERE p.closes_at <= $now
+        WITH p LIMIT $limit
+        OPTIONAL MATCH (:USER)-[v:VOTED]->(p)
+        WITH p, collect(v.selected_options) AS selections
+        SET
+        p.closed_at = p.closes_at,
+        p.result_options = p.options,
+        p.result_counts = [
+            option IN p.options |
+            size([selected IN selections WHERE option IN selected])
+        ]
+        REMOVE p.closes_at
+        RETURN count(p) AS closed
+        """
+        params = {"now": utcnow().timestamp(), "limit": self.batch_size}
+        while await self._run_batch(cypher, params) >= self.batch_size:
+            pass
+
+    async def prepare(self) -> None:
+        await self.neo4j_db.write_transaction(
+            self.neo4j_executor,
+            """
+            CREATE INDEX poll_closes_at IF NOT EXISTS
+            FOR (p:POLL) ON (p.closes_at)
+            """,
+            {},
+        )
+        # Polls created before the scheduler existed
+        cypher = f"""
+        MATCH (p:POST:POLL)
+        WHERE p.closes_at IS NULL AND p.closed_at IS NULL
+        WITH p LIMIT $limit
+        SET p.closes_at = {CLOSES_AT_EXPRESSION}
+        RETURN count(p) AS closed
+        """
+        params = {"limit": self.batch_size}
+        while await self._run_batch(cypher, params) >= self.batch_size:
+            pass
+
+    async def _run_batch(self, cypher: str, params: dict) -> int:
+        result = await self.neo4j_db.write_transaction(
+            self.neo4j_executor, cypher, params
+        )
+        return result[0]["closed"] if result else 0
+
+
+async def prepare_polls() -> None:
+    async with neo4j_session() as neo4j_db:
+        await PollClosingJob(neo4j_db).prepare()
+
+
+async def close_expired_polls() -> None:
+    async with neo4j_session() as neo4j_db:
+        await PollClosingJob(neo4j_db).run()
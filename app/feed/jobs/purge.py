@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from app.apps.base.sessions import neo4j_session
+from app.apps.feed.jobs.tags import TagIndexJob
+from app.apps.feed.search import unindex_comment
+from app.core.date import utcnow
+from app.core.neo4j import Base
+
+PURGE_BATCH_SIZE = 1000
+PURGE_SWEEP_INTERVAL = 600
+# Leaves the posts deleted just now to the purge task submitted by the delete
+PURGE_SWEEP_GRACE = timedelta(minutes=5)
+
+
+class PostPurgeJob(Base):
+    """Removes a soft-deleted post and everything hanging off it.
+
+    Each statement touches at most `batch_size` nodes or relationships, so a
+    post with a huge comment tree never turns into one huge transaction.
+    """
+
+    def __init__(self, neo4j_db, batch_size: int = PURGE_BATCH_SIZE):
+        super().__init__(neo4j_db)
+        self.neo4j_db = neo4j_db
+        self.batch_size = batch_size
+
+    async def run(self, post_id: int) -> None:
+        # Untagging first keeps the HASHTAG counters right
+        await TagIndexJob(self.neo4j_db).untag("POST", post_id)
+
+        params = {"post_id": post_id, "batch_size": self.batch_size}
+        # Comments, together with their own REPLY_ON/COMMENT_BY edges
+        cypher = """
+        MATCH (c:COMMENT)-[:BELONGS_TO]->(p:POST)
+        WHERE ID(p) = $post_id AND p.deleted_at IS NOT NULL
+        WITH c LIMIT $batch_size
+        WITH c, ID(c) AS comment_id
+        DETACH DELETE c
+        RETURN collect(comment_id) AS comment_ids
+        """
+        while True:
+            result = await self.neo4j_db.write_transaction(
+                self.neo4j_executor, cypher, params
+            )
+            comment_ids = result[0]["comment_ids"] if result else []
+            for comment_id in comment_ids:
+                unindex_comment(comment_id)
+            if len(comment_ids) < self.batch_size:
+                break
+
+        batch_cyphers = [
+            """
+            MATCH (:USER)-[r:COMMENTED_ON]->(p:POST)
+            WHERE ID(p) = $post_id AND p.deleted_at IS NOT NULL
+            WITH r LIMIT $batch_size
+            DELETE r
+            RETURN count(*) AS deleted
+            """,
+            """
+            MATCH (:USER)-[r:LIKE]->(p:POST)
+            WHERE ID(p) = $post_id AND p.deleted_at IS NOT NULL
+            WITH r LIMIT $batch_size
+            DELETE r
+            RETURN count(*) AS deleted
+            """,
+            """
+            MATCH (:USER)-[r:VOTED]->(p:POST)
+            WHERE ID(p) = $post_id AND p.deleted_at IS NOT NULL
+            WITH r LIMIT $batch_size
+            DELETE r
+            RETURN count(*) AS deleted
+            """,
+        ]
+        for cypher in batch_cyphers:
+            while await self._run_batch(cypher, params) >= self.batch_size:
+                pass
+
+        # Only a handful of edges are left at this point
+        cypher = """
+        MATCH (p:POST)
+        WHERE ID(p) = $post_id AND p.deleted_at IS NOT NULL
+        DETACH DELETE p
+        """
+        await self.neo4j_db.write_transaction(
+            self.neo4j_executor, cypher, params
+        )
+
+    async def sweep(self) -> None:
+        """Purges the soft-deleted posts whose purge task got lost, dropped
+        from a full queue or killed by a restart."""
+        cypher = """
+        MATCH (p:POST)
+        WHERE p.deleted_at <= $deleted_before
+        RETURN ID(p) AS id
+        LIMIT $limit
+        """
+        params = {
+            "deleted_before": (utcnow() - PURGE_SWEEP_GRACE).timestamp(),
+            "limit": self.batch_size,
+        }
+        while True:
+            result = await self.neo4j_db.read_transaction(
+                self.neo4j_executor, cypher, params
+            )
+            for record in result:
+                await self.run(record["id"])
+            if len(result) < self.batch_size:
+                break
+
+    async def prepare(self) -> None:
+        await self.neo4j_db.write_transaction(
+            self.neo4j_executor,
+            """
+            CREATE INDEX post_deleted_at IF NOT EXISTS
+            FOR (p:POST) ON (p.deleted_at)
+            """,
+            {},
+        )
+
+    async def _run_batch(self, cypher: str, params: dict) -> int:
+        result = await self.neo4j_db.write_transaction(
+            self.neo4j_executor, cypher, params
+        )
+        return result[0]["deleted"] if result else 0
+
+
+async def purge_post(post_id: int) -> None:
+    async with neo4j_session() as neo4j_db:
+        await PostPurgeJob(neo4j_db).run(post_id)
+
+
+async def prepare_purge() -> None:
+    async with neo4j_session() as neo4j_db:
+        await PostPurgeJob(neo4j_db).prepare()
+
+
+async def sweep_deleted_posts() -> None:
+    async with neo4j_session() as neo4j_db:
+        await PostPurgeJob(neo4j_db).sweep()
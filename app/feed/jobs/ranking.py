@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from app.apps.base.sessions import neo4j_session
+from app.apps.feed.ranking import HOT_DECAY_SECONDS, HotEntry, hot_ranking
+from app.core.date import utcnow
+from app.core.neo4j import Base
+
+# Older posts can't outscore the fresh ones anymore
+HOT_CANDIDATES_WINDOW = timedelta(days=7)
+HOT_RESCORE_INTERVAL = 60
+
+
+class HotRankingJob(Base):
+    """Rebuilds the hot ranking from the recent posts.
+
+    Catches the posts the incremental updates missed, e.g. those observed
+    by another process or before a restart. The score of `HotEntry` is
+    computed in Cypher, so only the top of the ranking leaves the database.
+    """
+
+    def __init__(self, neo4j_db):
+        super().__init__(neo4j_db)
+        self.neo4j_db = neo4j_db
+
+    async def run(self) -> None:
+        cypher = """
+        MATCH (p:POST)
+        WHERE p.created_at >= $since AND p.deleted_at IS NULL
+        WITH
+        p,
+        coalesce(p.likes_count, 0) AS likes_count,
+        coalesce(p.comments_count, 0) AS comments_count,
+        COUNT { (p)<-[:VOTED]-() } AS votes_count
+        WITH
+        p,
+        likes_count,
+        comments_count,
+        votes_count,
+        likes_count + 2 * comments_count + votes_count AS engagement
+        RETURN
+        ID(p) AS id,
+        p.created_at AS created_at,
+        likes_count,
+        comments_count,
+        votes_count,
+        log10(CASE WHEN engagement > 1 THEN engagement ELSE 1 END) +
+        p.created_at / $decay AS score
+        ORDER BY score DESC
+        LIMIT $size
+        """
+        params = {
+            "since": (utcnow() - HOT_CANDIDATES_WINDOW).timestamp(),
+            "decay": HOT_DECAY_SECONDS,
+            "size": hot_ranking.size,
+        }
+        result = await self.neo4j_db.read_transaction(
+            self.neo4j_executor, cypher, params
+        )
+        hot_ranking.rebuild(
+            {
+                record["id"]: HotEntry(
+                    created_at=record["created_at"],
+                    likes_count=record["likes_count"],
+                    comments_count=record["comments_count"],
+                    votes_count=record["votes_count"],
+                )
+                for record in result or []
+            }
+        )
+
+    async def prepare(self) -> None:
+        await self.neo4j_db.write_transaction(
+            self.neo4j_executor,
+            """
+            CREATE INDEX post_created_at IF NOT EXISTS
+            FOR (p:POST) ON (p.created_at)
+            """,
+            {},
+        )
+
+
+async def prepare_hot_ranking() -> None:
+    async with neo4j_session() as neo4j_db:
+        await HotRankingJob(neo4j_db).prepare()
+
+
+async def rescore_hot_ranking() -> None:
+    async with neo4j_session() as neo4j_db:
+        await HotRankingJob(neo4j_db).run()
@@ -0,0 +1,79 @@
+from app.apps.base.sessions import neo4j_session
+from app.apps.feed.search import (
+    COMMENT_FULLTEXT_INDEX,
+    POST_FULLTEXT_INDEX,
+    SEARCH_BACKEND,
+    InvertedIndex,
+    SearchBackends,
+    comment_index,
+    post_index,
+)
+from app.core.neo4j import Base
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+class SearchIndexJob(Base):
+    def __init__(self, neo4j_db, batch_size: int = BACKFILL_BATCH_SIZE):
+        super().__init__(neo4j_db)
+        self.neo4j_db = neo4j_db
+        self.batch_size = batch_size
+
+    async def create_fulltext_indexes(self) -> None:
+        # Index names can't be parameters
+        for cypher in (
+            f"""
+            CREATE FULLTEXT INDEX {POST_FULLTEXT_INDEX} IF NOT EXISTS
+            FOR (p:POST) ON EACH [p.content]
+            """,
+            f"""
+            CREATE FULLTEXT INDEX {COMMENT_FULLTEXT_INDEX} IF NOT EXISTS
+            FOR (c:COMMENT) ON EACH [c.content]
+            """,
+        ):
+            await self.neo4j_db.write_transaction(
+                self.neo4j_executor, cypher, {}
+            )
+
+    async def backfill_local_indexes(self) -> None:
+        await self._backfill(
+            post_index,
+            """
+            MATCH (n:POST)
+            WHERE ID(n) > $after_id AND n.deleted_at IS NULL
+            RETURN ID(n) AS id, n.content AS content
+            ORDER BY id
+            LIMIT $limit
+            """,
+        )
+        await self._backfill(
+            comment_index,
+            """
+            MATCH (n:COMMENT)
+            WHERE ID(n) > $after_id
+            RETURN ID(n) AS id, n.content AS content
+            ORDER BY id
+            LIMIT $limit
+            """,
+        )
+
+    async def _backfill(self, index: InvertedIndex, cypher: str) -> None:
+        params = {"after_id": -1, "limit": self.batch_size}
+        while True:
+            result = await self.neo4j_db.read_transaction(
+                self.neo4j_executor, cypher, params
+            )
+            for record in result or []:
+                index.add(record["id"], record["content"] or "")
+            if not result or len(result) < self.batch_size:
+                return
+            params["after_id"] = result[-1]["id"]
+
+
+async def prepare_search() -> None:
+    async with neo4j_session() as neo4j_db:
+        job = SearchIndexJob(neo4j_db)
+        if SEARCH_BACKEND == SearchBackends.LOCAL:
+            await job.backfill_local_indexes()
+        else:
+            await job.create_fulltext_indexes()
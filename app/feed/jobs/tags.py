@@ -0,0 +1,179 @@
+import asyncio
+
+from app.apps.base.routing import close_router
+from app.apps.base.sessions import neo4j_session
+from app.apps.feed.tags import extract_hashtags, extract_mentions
+from app.core.date import utcnow
+from app.core.neo4j import Base
+
+TAGS_BACKFILL_BATCH_SIZE = 500
+
+
+class TagIndexJob(Base):
+    """Keeps the TAG and MENTIONS relationships of a post or comment in
+    line with its content.
+
+    Only posts are counted in `HASHTAG.posts_count`, it is the total of the
+    `GET /post?tag=` listing. The content is read in the transaction that
+    writes the tags, so a task that runs late never indexes an old version.
+    """
+
+    tag_cyphers = {
+        "POST": """
+        UNWIND $nodes AS node
+        MATCH (n:POST)
+        WHERE ID(n) = node.id
+        OPTIONAL MATCH (n)-[old:TAG]->(t:HASHTAG)
+        WHERE NOT t.name IN node.hashtags
+        SET t.posts_count = t.posts_count - 1
+        DELETE old
+        WITH DISTINCT n, node
+        UNWIND node.hashtags AS name
+        MERGE (t:HASHTAG {name: name})
+        ON CREATE SET t.posts_count = 0
+        MERGE (n)-[r:TAG]->(t)
+        ON CREATE SET t.posts_count = t.posts_count + 1
+        """,
+        "COMMENT": """
+        UNWIND $nodes AS node
+        MATCH (n:COMMENT)
+        WHERE ID(n) = node.id
+        OPTIONAL MATCH (n)-[old:TAG]->(t:HASHTAG)
+        WHERE NOT t.name IN node.hashtags
+        DELETE old
+        WITH DISTINCT n, node
+        UNWIND node.hashtags AS name
+        MERGE (t:HASHTAG {name: name})
+        ON CREATE SET t.posts_count = 0
+        MERGE (n)-[r:TAG]->(t)
+        """,
+    }
+    mention_cyphers = {
+        label: f"""
+        UNWIND $nodes AS node
+        MATCH (n:{label})
+        WHERE ID(n) = node.id
+        OPTIONAL MATCH (n)-[old:MENTIONS]->(u:USER)
+        WHERE NOT u.username IN node.mentions
+        DELETE old
+        WITH DISTINCT n, node
+        MATCH (u:USER)
+        WHERE u.username IN node.mentions
+        MERGE (n)-[r:MENTIONS]->(u)
+        """
+        for label in ("POST", "COMMENT")
+    }
+    # Setting a property takes the write lock of the node, so the content
+    # can't change between reading it and writing its tags
+    content_cyphers = {
+        label: f"""
+        MATCH (n:{label})
+        WHERE ID(n) IN $ids AND n.deleted_at IS NULL
+        SET n.tags_indexed_at = $now
+        RETURN ID(n) AS id, n.content AS content
+        """
+        for label in ("POST", "COMMENT")
+    }
+    backfill_cyphers = {
+        label: f"""
+        MATCH (n:{label})
+        WHERE ID(n) > $after_id AND n.deleted_at IS NULL
+        RETURN ID(n) AS id
+        ORDER BY id
+        LIMIT $limit
+        """
+        for label in ("POST", "COMMENT")
+    }
+
+    def __init__(self, neo4j_db, batch_size: int = TAGS_BACKFILL_BATCH_SIZE):
+        super().__init__(neo4j_db)
+        self.neo4j_db = neo4j_db
+        self.batch_size = batch_size
+
+    async def run(self, label: str, node_ids: list[int]) -> None:
+        await self.neo4j_db.write_transaction(
+            self._index_current, label, node_ids
+        )
+
+    async def untag(self, label: str, node_id: int) -> None:
+        await self.neo4j_db.write_transaction(
+            self._index, label, [{"id": node_id, "content": ""}]
+        )
+
+    async def backfill(self, label: str) -> None:
+        params = {"after_id": -1, "limit": self.batch_size}
+        while True:
+            result = await self.neo4j_db.read_transaction(
+                self.neo4j_executor, self.backfill_cyphers[label], params
+            )
+            if not result:
+                return
+            await self.run(label, [record["id"] for record in result])
+            if len(result) < self.batch_size:
+                return
+            params["after_id"] = result[-1]["id"]
+
+    async def _index_current(
+        self, tx, label: str, node_ids: list[int]
+    ) -> None:
+        nodes = await self.neo4j_executor(
+            tx,
+            self.content_cyphers[label],
+            {"ids": node_ids, "now": utcnow().timestamp()},
+        )
+        if nodes:
+            await self._index(tx, label, nodes)
+
+    async def _index(self, tx, label: str, nodes: list[dict]) -> None:
+        params = {
+            "nodes": [
+                {
+                    "id": node["id"],
+                    "hashtags": extract_hashtags(node["content"] or ""),
+                    "mentions": extract_mentions(node["content"] or ""),
+                }
+                for node in nodes
+            ]
+        }
+        for cypher in (self.tag_cyphers[label], self.mention_cyphers[label]):
+            await self.neo4j_executor(tx, cypher, params)
+
+
+async def index_post_tags(post_id: int) -> None:
+    async with neo4j_session() as neo4j_db:
+        await TagIndexJob(neo4j_db).run("POST", [post_id])
+
+
+async def index_comment_tags(comment_id: int) -> None:
+    async with neo4j_session() as neo4j_db:
+        await TagIndexJob(neo4j_db).run("COMMENT", [comment_id])
+
+
+async def prepare_tags() -> None:
+    cypher = """
+    CREATE CONSTRAINT hashtag_name IF NOT EXISTS
+    FOR (t:HASHTAG) REQUIRE t.name IS UNIQUE
+    """
+    async with neo4j_session() as neo4j_db:
+        job = TagIndexJob(neo4j_db)
+        await neo4j_db.write_transaction(job.neo4j_executor, cypher, {})
+
+
+async def backfill_tags() -> None:
+    """Indexes the tags of the posts and comments created before tags were
+    extracted, safe to run again."""
+    async with neo4j_session() as neo4j_db:
+        job = TagIndexJob(neo4j_db)
+        await job.backfill("POST")
+        await job.backfill("COMMENT")
+
+
+async def main() -> None:
+    try:
+        await backfill_tags()
+    finally:
+        await close_router()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+
+from app.apps.base.sessions import neo4j_session
+from app.apps.base.tasks import task_queue
+from app.apps.feed.schemas.post import PostUserInfo
+from app.core.neo4j import Base
+
+logger = logging.getLogger(__name__)
+
+PROPAGATION_BATCH_SIZE = 500
+# Pause between two batches, leaves room for the live traffic
+PROPAGATION_PAUSE = 0.05
+
+
+class UserInfoPropagationJob(Base):
+    """Rewrites the author info copied onto the user's POST/COMMENT nodes.
+
+    The stale nodes are found by walking the user's own edges, which costs
+    the size of their history instead of a scan of the label.
+    """
+
+    stale_nodes_cyphers = {
+        "POST": """
+        MATCH (:USER {user_id: $user_id})<-[:CREATED_BY]-(n:POST)
+        WHERE
+        n.user_display_name <> $user_display_name OR
+        coalesce(n.user_headline, '') <> coalesce($user_headline, '') OR
+        coalesce(n.user_avatar, '') <> coalesce($user_avatar, '')
+        RETURN ID(n) AS id
+        """,
+        "COMMENT": """
+        MATCH (:USER {user_id: $user_id})<-[:COMMENT_BY]-(n:COMMENT)
+        WHERE
+        n.user_display_name <> $user_display_name OR
+        coalesce(n.user_avatar, '') <> coalesce($user_avatar, '')
+        RETURN ID(n) AS id
+        """,
+    }
+    update_cyphers = {
+        "POST": """
+        UNWIND $ids AS node_id
+        MATCH (n:POST)
+        WHERE ID(n) = node_id
+        SET
+        n.user_display_name = $user_display_name,
+        n.user_headline = $user_headline,
+        n.user_avatar = $user_avatar
+        """,
+        "COMMENT": """
+        UNWIND $ids AS node_id
+        MATCH (n:COMMENT)
+        WHERE ID(n) = node_id
+        SET
+        n.user_display_name = $user_display_name,
+        n.user_avatar = $user_avatar
+        """,
+    }
+
+    def __init__(
+        self,
+        neo4j_db,
+        batch_size: int = PROPAGATION_BATCH_SIZE,
+        pause: float = PROPAGATION_PAUSE,
+    ):
+        super().__init__(neo4j_db)
+        self.neo4j_db = neo4j_db
+        self.batch_size = batch_size
+        self.pause = pause
+
+    async def run(self, user_info: PostUserInfo) -> None:
+        params = user_info.dict()
+        for label, cypher in self.stale_nodes_cyphers.items():
+            result = await self.neo4j_db.read_transaction(
+                self.neo4j_executor, cypher, params
+            )
+            node_ids = [record["id"] for record in result or []]
+            for start in range(0, len(node_ids), self.batch_size):
+                batch = node_ids[start : start + self.batch_size]
+                await self.neo4j_db.write_transaction(
+                    self.neo4j_executor,
+                    self.update_cyphers[label],
+                    params | {"ids": batch},
+                )
+                await asyncio.sleep(self.pause)
+
+
+class UserInfoPropagationQueue:
+    """Coalesces profile changes so a user is rewritten once per burst.
+
+    Only the latest info of each user is kept while it waits, and a user has
+    at most one propagation task on the task queue at a time.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, PostUserInfo] = {}
+        self._scheduled: set[str] = set()
+
+    def push(self, user_info: PostUserInfo) -> None:
+        self._pending[user_info.user_id] = user_info
+        if user_info.user_id in self._scheduled:
+            return
+        # Marked only once the task is queued, a dropped or refused task
+        # leaves the info pending for the next push to schedule
+        if task_queue.submit(self._propagate, user_info.user_id):
+            self._scheduled.add(user_info.user_id)
+
+    async def _propagate(self, user_id: str) -> None:
+        # Retries here rather than on the task queue, so the user stays
+        # scheduled during the backoff and a push meanwhile doesn't start a
+        # second rewrite next to this one
+        failures = 0
+        try:
+            # Changes pushed while a rewrite runs are picked up right after it
+            while user_id in self._pending:
+                user_info = self._pending.pop(user_id)
+                try:
+                    async with neo4j_session() as neo4j_db:
+                        await UserInfoPropagationJob(neo4j_db).run(user_info)
+                except Exception:
+                    self._pending.setdefault(user_id, user_info)
+                    failures += 1
+                    if failures > task_queue.max_retries:
+                        # Kept pending, the next push starts over with it
+                        logger.exception(
+                            "Propagating the info of user %s failed", user_id
+                        )
+                        return
+                    await asyncio.sleep(
+                        task_queue.retry_delay * 2 ** (failures - 1)
+                    )
+                else:
+                    failures = 0
+        finally:
+            self._scheduled.discard(user_id)
+
+
+propagation_queue = UserInfoPropagationQueue()
+
+
+def on_user_info_changed(user_info: PostUserInfo) -> None:
+    """Entry point for profile change events."""
+    propagation_queue.push(user_info)
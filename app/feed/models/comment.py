@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic.tools import parse_obj_as
-from typing import Self
+from typing import Any, Self
 
 from app.apps.feed.schemas.comment import (
     CommentInput,
@@ -24,3 +25,16 @@ class Comment(CreatedUpdatedAt, CommentUserInfo):
     def to_output(self) -> CommentOutput:
         _comment_dict = self.dict()
         return parse_obj_as(CommentOutput, _comment_dict)
+
+    @classmethod
+    def to_projected_output(
+        cls, comment_node: dict, fields: set[str]
+    ) -> dict[str, Any]:
+        output = {"id": comment_node["id"]}
+        for field in fields - {"id"}:
+            output[field] = comment_node.get(field)
+        if "created_at" in fields:
+            output["created_at"] = parse_obj_as(
+                datetime, output["created_at"]
+            )
+        return output
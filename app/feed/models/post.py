@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import parse_obj_as
-from typing import Self
+from typing import Any, Self
 
 from app.apps.feed.schemas.post import (
     PollDurations,
@@ -14,6 +15,30 @@ from app.apps.feed.schemas.post import (
 )
 from app.core.neo4j import CreatedUpdatedAt
 
+# Node properties each output field is made of
+POST_OUTPUT_PROPERTIES: dict[str, tuple[str, ...]] = {
+    "id": (),
+    "post_type": ("post_type",),
+    "content": ("content",),
+    "image_url": ("image_url",),
+    "video_url": ("video_url",),
+    "poll_settings": (
+        "voting_type",
+        "duration",
+        "options",
+        "result_options",
+        "result_counts",
+    ),
+    "user_id": ("user_id",),
+    "user_display_name": ("user_display_name",),
+    "user_headline": ("user_headline",),
+    "user_avatar": ("user_avatar",),
+    "likes_count": ("likes_count",),
+    "comments_count": ("comments_count",),
+    "created_at": ("created_at",),
+    "updated_at": ("updated_at",),
+}
+
 
 class Post(CreatedUpdatedAt, PostUserInfo):
     content: str
@@ -25,6 +50,10 @@ class Post(CreatedUpdatedAt, PostUserInfo):
     voting_type: VotingTypes | None = None
     duration: PollDurations | None = None
     options: list[str] | None = None
+    # frozen counts of the options titled as in result_options, set once
+    # the poll is closed
+    result_options: list[str] | None = None
+    result_counts: list[int] | None = None
 
     # counts
     likes_count: int = 0
@@ -46,18 +75,59 @@ class Post(CreatedUpdatedAt, PostUserInfo):
     def to_output(self) -> PostOutput:
         _post_dict = self.dict()
         if self.post_type == PostTypes.POLL:
-            assert (
-                self.voting_type is not None
-                and self.duration is not None
-                and self.options is not None
-            )
-            _post_dict["poll_settings"] = RevealedPollSettings(
-                voting_type=self.voting_type,
-                duration=self.duration,
-                options=[
-                    PollOptionResult(title=option_title)
-                    for option_title in self.options
-                ],
-            )
+            _post_dict["poll_settings"] = self.poll_settings_output()
 
         return parse_obj_as(PostOutput, _post_dict)
+
+    def poll_settings_output(self) -> RevealedPollSettings:
+        assert (
+            self.voting_type is not None
+            and self.duration is not None
+            and self.options is not None
+        )
+        result_counts = self.result_counts_by_option()
+        return RevealedPollSettings(
+            voting_type=self.voting_type,
+            duration=self.duration,
+            options=[
+                PollOptionResult(
+                    title=option_title,
+                    count=result_counts.get(option_title, 0),
+                )
+                for option_title in self.options
+            ],
+        )
+
+    def result_counts_by_option(self) -> dict[str, int]:
+        """Frozen counts of a closed poll by option title, so editing the
+        options afterwards can't shift them onto other options."""
+        # Polls closed before the titles were frozen with the counts
+        titles = self.result_options or self.options or []
+        return dict(zip(titles, self.result_counts or []))
+
+    @staticmethod
+    def projection_properties(fields: set[str]) -> set[str]:
+        properties = {"post_type"}
+        for field in fields:
+            properties.update(POST_OUTPUT_PROPERTIES[field])
+        return properties
+
+    @classmethod
+    def to_projected_output(
+        cls, post_node: dict, fields: set[str]
+    ) -> dict[str, Any]:
+        """Output holding only the requested fields of a node fetched with
+        `projection_properties`."""
+        output = {"id": post_node["id"], "post_type": post_node["post_type"]}
+        for field in fields - {"id", "post_type", "poll_settings"}:
+            output[field] = post_node.get(field)
+        for field in {"created_at", "updated_at"} & fields:
+            output[field] = parse_obj_as(datetime, output[field])
+        if (
+            "poll_settings" in fields
+            and post_node["post_type"] == PostTypes.POLL
+        ):
+            output["poll_settings"] = cls.construct(
+                **post_node
+            ).poll_settings_output()
+        return output
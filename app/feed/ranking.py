@@ -0,0 +1,90 @@
+import math
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+HOT_RANKING_SIZE = 1000
+# Every HOT_DECAY_SECONDS a post needs ten times the engagement to keep up
+# with a newer one
+HOT_DECAY_SECONDS = 45_000
+
+
+@dataclass
+class HotEntry:
+    created_at: float
+    likes_count: int = 0
+    comments_count: int = 0
+    votes_count: int = 0
+
+    @property
+    def score(self) -> float:
+        # The decay lives in the created_at term, so the relative order of
+        # two posts doesn't change as time passes and scores never go stale.
+        engagement = (
+            self.likes_count + 2 * self.comments_count + self.votes_count
+        )
+        return math.log10(max(engagement, 1)) + (
+            self.created_at / HOT_DECAY_SECONDS
+        )
+
+
+class HotRanking:
+    """Bounded top-K index of posts ordered by their hot score."""
+
+    def __init__(self, size: int = HOT_RANKING_SIZE):
+        self.size = size
+        self._entries: dict[int, HotEntry] = {}
+        # (-score, post_id), kept sorted so the hottest post comes first
+        self._ranked: list[tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+    def page(self, offset: int, limit: int) -> list[int]:
+        return [
+            post_id for _, post_id in self._ranked[offset : offset + limit]
+        ]
+
+    def observe(
+        self,
+        post_id: int,
+        created_at: float,
+        likes_count: int,
+        comments_count: int,
+        votes_count: int,
+    ) -> None:
+        entry = HotEntry(
+            created_at=created_at,
+            likes_count=likes_count,
+            comments_count=comments_count,
+            votes_count=votes_count,
+        )
+        key = (-entry.score, post_id)
+        if (
+            post_id not in self._entries
+            and len(self._ranked) >= self.size
+            and key >= self._ranked[-1]
+        ):
+            return
+
+        self.discard(post_id)
+        self._entries[post_id] = entry
+        insort(self._ranked, key)
+        if len(self._ranked) > self.size:
+            _, evicted_id = self._ranked.pop()
+            del self._entries[evicted_id]
+
+    def discard(self, post_id: int) -> None:
+        if (entry := self._entries.pop(post_id, None)) is None:
+            return
+        index = bisect_left(self._ranked, (-entry.score, post_id))
+        del self._ranked[index]
+
+    def rebuild(self, entries: dict[int, HotEntry]) -> None:
+        ranked = sorted(
+            (-entry.score, post_id) for post_id, entry in entries.items()
+        )[: self.size]
+        self._ranked = ranked
+        self._entries = {post_id: entries[post_id] for _, post_id in ranked}
+
+
+hot_ranking = HotRanking()
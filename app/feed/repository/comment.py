@@ -1,15 +1,35 @@
-import json
 
 from fastapi import HTTPException
 from motor.core import AgnosticDatabase
 
+from app.apps.base.cypher import to_cypher_params
+from app.apps.base.pagination import decode_cursor
+from app.apps.base.projection import map_projection, parse_fields
+from app.apps.base.tasks import task_queue
+from app.apps.base.unit_of_work import after_commit, gather
+from app.apps.feed.events import PostEvents, publish_post_event
+from app.apps.feed.jobs.counters import refresh_post_counters
+from app.apps.feed.jobs.tags import index_comment_tags
 from app.apps.feed.models.comment import Comment
+from app.apps.feed.repository import statements
+from app.apps.feed.search import (
+    COMMENT_FULLTEXT_INDEX,
+    SEARCH_BACKEND,
+    SearchBackends,
+    comment_index,
+    fulltext_query,
+    index_comment,
+    next_search_cursor,
+    unindex_comment,
+)
 from app.apps.feed.schemas.comment import (
     CommentInput,
     CommentOutput,
     CommentsListParams,
+    CommentsSearchParams,
     CommentUserInfo,
     PaginatedComments,
+    SearchedComments,
 )
 from app.core.neo4j import Base
 from app.schemas.users import User
@@ -26,54 +46,81 @@ class CommentRepository(Base):
     async def create_comment(
         self, comment_data: CommentInput
     ) -> CommentOutput | None:
-        comment = Comment.parse_obj(
-            comment_data.dict() | (await self.get_user_info()).dict()
+        user_info, post_exists = await gather(
+            self.get_user_info(), self.post_exists(comment_data.post_id)
         )
+        if not post_exists:
+            raise HTTPException(status_code=404, detail="Post not found")
+        comment = Comment.parse_obj(comment_data.dict() | user_info.dict())
 
-        cypher = f"""
-        MATCH (p:POST), (u:USER)
-        WHERE ID(p) = $post_id AND u.user_id = $user_id
-        CREATE (c:COMMENT {{
-            {comment.get_cypher_fields()}
-        }})
-        CREATE (c)-[r1:BELONGS_TO]->(p)<-[r2:COMMENTED_ON]-(u),
-               (c)-[r3:COMMENT_BY]->(u)
-        SET p.comments_count = (p.comments_count + 1)
-        RETURN ID(c) AS id, c
-        """
+        params = {
+            "post_id": comment.post_id,
+            "user_id": comment.user_id,
+            # The reply is linked in the same statement, so deleting the
+            # parent always takes it along
+            "parent_id": comment.parent_id or None,
+            "properties": to_cypher_params(comment),
+        }
         result = await self.neo4j_db.write_transaction(
-            self.neo4j_executor, cypher, json.loads(comment.json())
+            self.neo4j_executor, statements.CREATE_COMMENT, params
         )
 
-        if comment_data.parent_id:
-            params = {
-                "parent_id": comment_data.parent_id,
-                "child_id": result[0]["id"],
-            }
-            cypher = """
-            MATCH (pc:COMMENT), (cc:COMMENT)
-            WHERE ID(pc) = $parent_id AND ID(cc) = $child_id
-            CREATE (cc)-[r:REPLY_ON]->(pc)
-            """
-            await self.neo4j_db.write_transaction(
-                self.neo4j_executor, cypher, params
-            )
-
-        return Comment.parse_obj(
+        comment_output = Comment.parse_obj(
             self.process_raw_graph(result, "c")[0]
         ).to_output()
 
+        after_commit(
+            self.neo4j_db,
+            task_queue.submit,
+            refresh_post_counters,
+            comment_data.post_id,
+        )
+        after_commit(
+            self.neo4j_db,
+            task_queue.submit,
+            index_comment_tags,
+            comment_output.id,
+        )
+        after_commit(
+            self.neo4j_db,
+            publish_post_event,
+            comment_data.post_id,
+            PostEvents.COMMENT_CREATED,
+            comment_output,
+        )
+        after_commit(
+            self.neo4j_db,
+            index_comment,
+            comment_output.id,
+            comment_output.content,
+        )
+        return comment_output
+
+    async def post_exists(self, post_id: int) -> bool:
+        cypher = """
+        MATCH (p:POST)
+        WHERE ID(p) = $post_id AND p.deleted_at IS NULL
+        RETURN ID(p) AS id
+        """
+        result = await self.neo4j_db.read_transaction(
+            self.neo4j_executor, cypher, {"post_id": post_id}
+        )
+        return bool(result)
+
     async def list_comments(
         self, params: CommentsListParams
     ) -> PaginatedComments:
-        cypher = """
+        fields = parse_fields(params.fields, CommentOutput.__fields__)
+        # Every output field is a node property of the same name
+        node = "c" if fields is None else map_projection("c", fields - {"id"})
+        cypher = f"""
         MATCH (c:COMMENT)
         WITH count(c) AS total
         MATCH (c:COMMENT)-[r1:BELONGS_TO]->(p:POST)
         WHERE ID(p) = $post_id
         WITH c, total
         ORDER BY c.created_at DESC
-        RETURN ID(c) AS id, c, total
+        RETURN ID(c) AS id, {node}, total
         SKIP $offset LIMIT $limit
         """
         query_params = {
@@ -90,9 +137,75 @@ class CommentRepository(Base):
             count = result[0]["total"]
             comments = [
                 Comment.parse_obj(comment).to_output()
+                if fields is None
+                else Comment.to_projected_output(comment, fields)
                 for comment in self.process_raw_graph(result, "c")
             ]
-        return PaginatedComments(data=comments, count=count)
+        return PaginatedComments.construct(data=comments, count=count)
+
+    async def search_comments(
+        self, params: CommentsSearchParams
+    ) -> SearchedComments:
+        after = decode_cursor(params.cursor)
+        if SEARCH_BACKEND == SearchBackends.LOCAL:
+            hits = comment_index.search(
+                params.q,
+                params.limit,
+                after=(after["score"], after["id"]) if after else None,
+            )
+            cypher = """
+            MATCH (c:COMMENT)-[:BELONGS_TO]->(p:POST)
+            WHERE ID(c) IN $comment_ids AND p.deleted_at IS NULL
+            RETURN ID(c) AS id, c
+            """
+            query_params = {
+                "comment_ids": [comment_id for _, comment_id in hits]
+            }
+        else:
+            if not (query := fulltext_query(params.q)):
+                return SearchedComments(data=[])
+            cypher = """
+            CALL db.index.fulltext.queryNodes($index, $query)
+            YIELD node AS c, score
+            WHERE
+            $after_score IS NULL OR
+            score < $after_score OR
+            (score = $after_score AND ID(c) > $after_id)
+            MATCH (c)-[:BELONGS_TO]->(p:POST)
+            WHERE p.deleted_at IS NULL
+            RETURN ID(c) AS id, c, score
+            ORDER BY score DESC, id ASC
+            LIMIT $limit
+            """
+            query_params = {
+                "index": COMMENT_FULLTEXT_INDEX,
+                "query": query,
+                "after_score": after["score"] if after else None,
+                "after_id": after["id"] if after else None,
+                "limit": params.limit,
+            }
+
+        result = await self.neo4j_db.read_transaction(
+            self.neo4j_executor, cypher, query_params
+        )
+        comment_nodes = {
+            comment["id"]: comment
+            for comment in self.process_raw_graph(result or [], "c")
+        }
+        if SEARCH_BACKEND != SearchBackends.LOCAL:
+            hits = [
+                (comment["score"], comment_id)
+                for comment_id, comment in comment_nodes.items()
+            ]
+
+        return SearchedComments(
+            data=[
+                Comment.parse_obj(comment_nodes[comment_id]).to_output()
+                for _, comment_id in hits
+                if comment_id in comment_nodes
+            ],
+            next_cursor=next_search_cursor(hits, params.limit),
+        )
 
     async def find_parent_id(self, comment_node_id: int) -> int | None:
         cypher = """
@@ -115,9 +228,11 @@ class CommentRepository(Base):
         MATCH (c:COMMENT)-[r1:BELONGS_TO]->(p:POST)
         WHERE ID(c) = $comment_id AND c.user_id = $user_id
         OPTIONAL MATCH (c)<-[r:REPLY_ON]-(cc:COMMENT)
-        DETACH DELETE c, cc
-        SET p.comments_count = (p.comments_count - 1)
-        RETURN c
+        WITH c, p, collect(cc) AS replies
+        WITH c, p, replies, [reply IN replies | ID(reply)] AS reply_ids
+        FOREACH (reply IN replies | DETACH DELETE reply)
+        DETACH DELETE c
+        RETURN ID(p) AS post_id, reply_ids
         """
 
         params = {"comment_id": comment_id, "user_id": str(self.user.id)}
@@ -126,6 +241,19 @@ class CommentRepository(Base):
         )
         if not result:
             raise HTTPException(status_code=404, detail="Comment not found")
+        post_id = result[0]["post_id"]
+        after_commit(
+            self.neo4j_db, task_queue.submit, refresh_post_counters, post_id
+        )
+        after_commit(
+            self.neo4j_db,
+            publish_post_event,
+            post_id,
+            PostEvents.COMMENT_DELETED,
+            {"id": comment_id},
+        )
+        for deleted_id in [comment_id, *result[0]["reply_ids"]]:
+            after_commit(self.neo4j_db, unindex_comment, deleted_id)
 
     async def get_user_info(self) -> CommentUserInfo:
         if personal_info := await self.mongo_db.personal.find_one(
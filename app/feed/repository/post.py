@@ -1,11 +1,37 @@
-import json
 from datetime import datetime, timedelta
 from typing import Any
 
 from fastapi import HTTPException, status
 from motor.core import AgnosticDatabase
 
-from app.apps.feed.models.post import Post
+from app.apps.base.cypher import to_cypher_params
+from app.apps.base.pagination import decode_cursor, encode_cursor
+from app.apps.base.projection import map_projection, parse_fields
+from app.apps.base.tasks import task_queue
+from app.apps.base.unit_of_work import after_commit
+from app.apps.feed.cache import feed_cache
+from app.apps.feed.events import (
+    PostEvents,
+    has_post_subscribers,
+    publish_post_event,
+)
+from app.apps.feed.jobs.counters import refresh_post_counters
+from app.apps.feed.jobs.purge import purge_post
+from app.apps.feed.jobs.tags import index_post_tags
+from app.apps.feed.jobs.user_info import on_user_info_changed
+from app.apps.feed.models.post import POST_OUTPUT_PROPERTIES, Post
+from app.apps.feed.ranking import hot_ranking
+from app.apps.feed.repository import statements
+from app.apps.feed.search import (
+    POST_FULLTEXT_INDEX,
+    SEARCH_BACKEND,
+    SearchBackends,
+    fulltext_query,
+    index_post,
+    next_search_cursor,
+    post_index,
+    unindex_post,
+)
 from app.apps.feed.schemas.post import (
     PaginatedPosts,
     PollDurations,
@@ -13,7 +39,10 @@ from app.apps.feed.schemas.post import (
     PostInput,
     PostOutput,
     PostsListParams,
+    PostsSearchParams,
+    PostsSort,
     PostUserInfo,
+    SearchedPosts,
     VotingTypes,
 )
 from app.core.date import utcnow
@@ -32,27 +61,45 @@ class PostRepository(Base):
     async def create_post(self, post_data: PostInput) -> PostOutput:
         post = Post.from_input(post_data, await self.get_user_info())
 
-        cypher = f"""
-        MATCH (u:USER)
-        WHERE u.user_id = $user_id
-        CREATE (p:POST:{post_data.post_type} {{
-            {post.get_cypher_fields()}
-        }})
-        CREATE (p)-[r:CREATED_BY]->(u)
-        RETURN ID(p) AS id, p, labels(p)[1] AS type
-        """
-
+        params = {
+            "user_id": post.user_id,
+            "properties": to_cypher_params(post),
+        }
         result = await self.neo4j_db.write_transaction(
-            self.neo4j_executor, cypher, json.loads(post.json())
+            self.neo4j_executor,
+            statements.CREATE_POST[post_data.post_type],
+            params,
         )
         result = self.process_raw_graph(result, "p")
         post_node = Post.parse_obj(result[0])
-        return post_node.to_output()
+        post_output = post_node.to_output()
+        # Lets the new post enter the hot ranking
+        after_commit(
+            self.neo4j_db,
+            task_queue.submit,
+            refresh_post_counters,
+            post_output.id,
+        )
+        after_commit(
+            self.neo4j_db,
+            task_queue.submit,
+            index_post_tags,
+            post_output.id,
+        )
+        after_commit(
+            self.neo4j_db, index_post, post_output.id, post_output.content
+        )
+        after_commit(self.neo4j_db, feed_cache.invalidate)
+        return post_output
 
-    async def get_post(self, post_id: int) -> PostOutput | None:
-        cypher = """
-        MATCH (p:POST) WHERE ID(p) = $post_id
-        RETURN ID(p) AS id, p, labels(p)[1] AS type
+    async def get_post(
+        self, post_id: int, fields: str | None = None
+    ) -> PostOutput | dict | None:
+        projected_fields = parse_fields(fields, POST_OUTPUT_PROPERTIES)
+        cypher = f"""
+        MATCH (p:POST) WHERE ID(p) = $post_id AND p.deleted_at IS NULL
+        RETURN ID(p) AS id, {self.post_return(projected_fields)},
+        labels(p)[1] AS type
         """
         params = {"post_id": post_id}
         result = await self.neo4j_db.read_transaction(
@@ -61,17 +108,25 @@ class PostRepository(Base):
         if not result:
             return None
 
-        result = Post.parse_obj(self.process_raw_graph(result, "p")[0])
-        return result.to_output()
+        return self.post_output(
+            self.process_raw_graph(result, "p")[0], projected_fields
+        )
 
     async def list_posts(self, params: PostsListParams) -> PaginatedPosts:
-        cypher = """
-        MATCH (pc:POST)
+        projected_fields = parse_fields(params.fields, POST_OUTPUT_PROPERTIES)
+        if params.tag is not None:
+            return await self.list_tagged_posts(params, projected_fields)
+        if params.sort == PostsSort.HOT:
+            return await self.list_hot_posts(params, projected_fields)
+
+        cypher = f"""
+        MATCH (pc:POST) WHERE pc.deleted_at IS NULL
         WITH count(pc) AS total
-        MATCH (p:POST)
+        MATCH (p:POST) WHERE p.deleted_at IS NULL
         WITH p, total
         ORDER BY p.created_at DESC
-        RETURN ID(p) AS id, p, labels(p)[1] AS type, total
+        RETURN ID(p) AS id, {self.post_return(projected_fields)},
+        labels(p)[1] AS type, total
         SKIP $offset LIMIT $limit
         """
         query_params = {"offset": params.offset, "limit": params.limit}
@@ -84,95 +139,268 @@ class PostRepository(Base):
             result = self.process_raw_graph(result, "p")
             count = result[0]["total"]
             posts = [
-                Post.parse_obj(post_node).to_output() for post_node in result
+                self.post_output(post_node, projected_fields)
+                for post_node in result
             ]
-        return PaginatedPosts(data=posts, count=count)
+        return PaginatedPosts.construct(data=posts, count=count)
+
+    async def list_tagged_posts(
+        self, params: PostsListParams, fields: set[str] | None = None
+    ) -> PaginatedPosts:
+        after = decode_cursor(params.cursor)
+        cypher = f"""
+        MATCH (p:POST)-[:TAG]->(t:HASHTAG {{name: $tag}})
+        WHERE
+        p.deleted_at IS NULL AND (
+            $after_created_at IS NULL OR
+            p.created_at < $after_created_at OR
+            (p.created_at = $after_created_at AND ID(p) < $after_id)
+        )
+        RETURN
+        ID(p) AS id,
+        {self.post_return(fields)},
+        labels(p)[1] AS type,
+        p.created_at AS created_at,
+        t.posts_count AS total
+        ORDER BY created_at DESC, id DESC
+        LIMIT $limit
+        """
+        query_params = {
+            "tag": params.tag.lower(),
+            "after_created_at": after["created_at"] if after else None,
+            "after_id": after["id"] if after else None,
+            "limit": params.limit,
+        }
+        result = await self.neo4j_db.read_transaction(
+            self.neo4j_executor, cypher, query_params
+        )
+        if not result:
+            return PaginatedPosts(data=[], count=0)
+
+        next_cursor = None
+        if len(result) == params.limit:
+            last = result[-1]
+            next_cursor = encode_cursor(
+                {"created_at": last["created_at"], "id": last["id"]}
+            )
+        result = self.process_raw_graph(result, "p")
+        return PaginatedPosts.construct(
+            data=[self.post_output(post_node, fields) for post_node in result],
+            count=result[0]["total"],
+            next_cursor=next_cursor,
+        )
+
+    async def list_hot_posts(
+        self, params: PostsListParams, fields: set[str] | None = None
+    ) -> PaginatedPosts:
+        post_ids = hot_ranking.page(params.offset, params.limit)
+        cypher = f"""
+        MATCH (p:POST)
+        WHERE ID(p) IN $post_ids AND p.deleted_at IS NULL
+        RETURN ID(p) AS id, {self.post_return(fields)}, labels(p)[1] AS type
+        """
+        result = await self.neo4j_db.read_transaction(
+            self.neo4j_executor, cypher, {"post_ids": post_ids}
+        )
+        post_nodes = {
+            post_node["id"]: post_node
+            for post_node in self.process_raw_graph(result or [], "p")
+        }
+        posts = [
+            self.post_output(post_nodes[post_id], fields)
+            for post_id in post_ids
+            if post_id in post_nodes
+        ]
+        return PaginatedPosts.construct(data=posts, count=len(hot_ranking))
+
+    @staticmethod
+    def post_return(fields: set[str] | None) -> str:
+        """RETURN item of the `p` node, only with the requested fields."""
+        if fields is None:
+            return "p"
+        return map_projection("p", Post.projection_properties(fields))
+
+    @staticmethod
+    def post_output(
+        post_node: dict, fields: set[str] | None
+    ) -> PostOutput | dict:
+        if fields is None:
+            return Post.parse_obj(post_node).to_output()
+        return Post.to_projected_output(post_node, fields)
+
+    async def search_posts(self, params: PostsSearchParams) -> SearchedPosts:
+        after = decode_cursor(params.cursor)
+        if SEARCH_BACKEND == SearchBackends.LOCAL:
+            hits = post_index.search(
+                params.q,
+                params.limit,
+                after=(after["score"], after["id"]) if after else None,
+            )
+            cypher = """
+            MATCH (p:POST)
+            WHERE ID(p) IN $post_ids AND p.deleted_at IS NULL
+            RETURN ID(p) AS id, p, labels(p)[1] AS type
+            """
+            query_params = {"post_ids": [post_id for _, post_id in hits]}
+        else:
+            if not (query := fulltext_query(params.q)):
+                return SearchedPosts(data=[])
+            cypher = """
+            CALL db.index.fulltext.queryNodes($index, $query)
+            YIELD node AS p, score
+            WHERE
+            p.deleted_at IS NULL AND (
+                $after_score IS NULL OR
+                score < $after_score OR
+                (score = $after_score AND ID(p) > $after_id)
+            )
+            RETURN ID(p) AS id, p, labels(p)[1] AS type, score
+            ORDER BY score DESC, id ASC
+            LIMIT $limit
+            """
+            query_params = {
+                "index": POST_FULLTEXT_INDEX,
+                "query": query,
+                "after_score": after["score"] if after else None,
+                "after_id": after["id"] if after else None,
+                "limit": params.limit,
+            }
+
+        result = await self.neo4j_db.read_transaction(
+            self.neo4j_executor, cypher, query_params
+        )
+        post_nodes = {
+            post_node["id"]: post_node
+            for post_node in self.process_raw_graph(result or [], "p")
+        }
+        if SEARCH_BACKEND != SearchBackends.LOCAL:
+            hits = [
+                (post_node["score"], post_id)
+                for post_id, post_node in post_nodes.items()
+            ]
+
+        return SearchedPosts(
+            data=[
+                Post.parse_obj(post_nodes[post_id]).to_output()
+                for _, post_id in hits
+                if post_id in post_nodes
+            ],
+            next_cursor=next_search_cursor(hits, params.limit),
+        )
 
     async def update_post(
         self, post_id: int, post_data: PostInput
     ) -> PostOutput | None:
         post = Post.from_input(post_data, await self.get_user_info())
 
-        cypher = f"""
-        MATCH (p:POST:{post_data.post_type})
-        WHERE
-        ID(p) = $post_id AND
-        p.user_id = $user_id
-        SET p += $update_params
-        RETURN ID(p) AS id, p, labels(p)[1] AS type
-        """
-
         update_params = {
             "post_id": post_id,
             "user_id": str(self.user.id),
-            "update_params": json.loads(post.json()),
+            # The results of a closed poll are never overwritten
+            "update_params": to_cypher_params(
+                post, exclude={"result_options", "result_counts"}
+            ),
         }
         result = await self.neo4j_db.write_transaction(
-            self.neo4j_executor, cypher, update_params
+            self.neo4j_executor,
+            statements.UPDATE_POST[post_data.post_type],
+            update_params,
         )
         if not result:
             return None
 
         result = self.process_raw_graph(result, "p")
         post_node = Post.parse_obj(result[0])
-        return post_node.to_output()
+        post_output = post_node.to_output()
+        after_commit(
+            self.neo4j_db,
+            task_queue.submit,
+            index_post_tags,
+            post_output.id,
+        )
+        after_commit(
+            self.neo4j_db, index_post, post_output.id, post_output.content
+        )
+        return post_output
 
     async def delete_post(self, post_id: int) -> None:
+        # Only mark the post here, the comments and reactions are removed in
+        # batches by `PostPurgeJob` once the response has been sent.
         cypher = """
         MATCH (p:POST)
         WHERE
         ID(p) = $post_id AND
-        p.user_id = $user_id
-        OPTIONAL MATCH (c:COMMENT)-[r1:BELONGS_TO]->(p)
-        DETACH DELETE p, c
-        RETURN p
+        p.user_id = $user_id AND
+        p.deleted_at IS NULL
+        SET p.deleted_at = $deleted_at
+        RETURN ID(p) AS id
         """
-        params = {"post_id": post_id, "user_id": str(self.user.id)}
+        params = {
+            "post_id": post_id,
+            "user_id": str(self.user.id),
+            "deleted_at": utcnow().timestamp(),
+        }
 
         result = await self.neo4j_db.write_transaction(
             self.neo4j_executor, cypher, params
         )
         if not result:
             raise HTTPException(status_code=404, detail="Post not found")
-
-    async def like_post(self, post_id: int) -> None:
-        # Remove the previous like
-        cypher = """
-        MATCH (u:USER) -[pr:LIKE]-> (p:POST)
-        WHERE
-        ID(p) = $post_id AND
-        u.user_id = $user_id
-        DELETE pr
-        SET p.likes_count = (p.likes_count - 1)
-        """
-        params = {"post_id": post_id, "user_id": str(self.user.id)}
-        await self.neo4j_db.write_transaction(
-            self.neo4j_executor, cypher, params
+        after_commit(self.neo4j_db, task_queue.submit, purge_post, post_id)
+        after_commit(self.neo4j_db, hot_ranking.discard, post_id)
+        after_commit(self.neo4j_db, unindex_post, post_id)
+        after_commit(self.neo4j_db, feed_cache.invalidate)
+        after_commit(
+            self.neo4j_db,
+            publish_post_event,
+            post_id,
+            PostEvents.POST_DELETED,
+            {"id": post_id},
         )
 
-        # Create new one
+    async def like_post(self, post_id: int) -> None:
+        # Replaces the previous like, if any
         cypher = """
         MATCH (p:POST), (u:USER)
         WHERE
         ID(p) = $post_id AND
+        p.deleted_at IS NULL AND
         u.user_id = $user_id
+        OPTIONAL MATCH (u) -[pr:LIKE]-> (p)
+        DELETE pr
+        WITH DISTINCT p, u
         CREATE (u) -[r:LIKE {created_at: $created_at}] -> (p)
-        SET p.likes_count = (p.likes_count + 1)
         """
-        params |= {"created_at": utcnow().timestamp()}
+        params = {
+            "post_id": post_id,
+            "user_id": str(self.user.id),
+            "created_at": utcnow().timestamp(),
+        }
         await self.neo4j_db.write_transaction(
             self.neo4j_executor, cypher, params
         )
+        after_commit(
+            self.neo4j_db, task_queue.submit, refresh_post_counters, post_id
+        )
 
     async def vote_post(
         self, post_id: int, vote_options: list[str]
     ) -> PostOutput:
+        # The poll and the user's vote on it are read in one go
         cypher = """
         MATCH (p:POST:POLL)
-        WHERE ID(p) = $post_id
-        RETURN ID(p) AS id, p, labels(p)[1] AS type
+        WHERE ID(p) = $post_id AND p.deleted_at IS NULL
+        OPTIONAL MATCH (u:USER {user_id: $user_id})-[pr:VOTED]->(p)
+        RETURN
+        ID(p) AS id,
+        p,
+        labels(p)[1] AS type,
+        count(pr) > 0 AS voted
         """
-        query_params: dict[str, Any] = {"post_id": post_id}
+        query_params: dict[str, Any] = {
+            "post_id": post_id,
+            "user_id": str(self.user.id),
+        }
         result = await self.neo4j_db.read_transaction(
             self.neo4j_executor, cypher, query_params
         )
@@ -182,6 +410,11 @@ class PostRepository(Base):
                 detail="Poll not found",
             )
         result = self.process_raw_graph(result, "p")[0]
+        if result.get("closed_at") is not None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="The poll was expired",
+            )
         await self.poll_expiration_checker(
             poll_created_at=result.get("created_at", 0),
             poll_duration=result.get("duration", 0),
@@ -191,17 +424,7 @@ class PostRepository(Base):
             selected_options=vote_options,
             poll_voting_type=result.get("voting_type", None),
         )
-
-        cypher = """
-        MATCH (u:USER {user_id: $user_id}), (p:POST:POLL)
-        WHERE ID(p) = $post_id
-        OPTIONAL MATCH (u)-[pr:VOTED]->(p)
-        RETURN pr
-        """
-        query_params |= dict(user_id=str(self.user.id))
-        if await self.neo4j_db.read_transaction(
-            self.neo4j_executor, cypher, query_params
-        ):
+        if result["voted"]:
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail="Already voted",
@@ -210,8 +433,6 @@ class PostRepository(Base):
         cypher = """
         MATCH (u:USER {user_id: $user_id}), (p:POST:POLL)
         WHERE ID(p) = $post_id
-        OPTIONAL MATCH (u)-[pr:VOTED]->(p)
-        DELETE pr
 
         // Create a new VOTED relationship with new properties
         CREATE (u)-[r:VOTED {
@@ -222,7 +443,6 @@ class PostRepository(Base):
         RETURN ID(p) AS id, p, labels(p)[1] AS type
         """
         query_params |= {
-            "user_id": str(self.user.id),
             "selected_options": vote_options,
             "created_at": utcnow().timestamp(),
         }
@@ -230,8 +450,32 @@ class PostRepository(Base):
             self.neo4j_executor, cypher, query_params
         )
         post = Post.parse_obj(self.process_raw_graph(final_result, "p")[0])
+        after_commit(
+            self.neo4j_db, task_queue.submit, refresh_post_counters, post_id
+        )
+        # Tallying costs a scan of the VOTED edges, skip it when nobody listens
+        if has_post_subscribers(post_id):
+            after_commit(
+                self.neo4j_db,
+                publish_post_event,
+                post_id,
+                PostEvents.POLL_TALLIES_CHANGED,
+                await self.poll_tallies(post_id),
+            )
         return post.to_output()
 
+    async def poll_tallies(self, post_id: int) -> dict[str, int]:
+        cypher = """
+        MATCH (:USER)-[v:VOTED]->(p:POST:POLL)
+        WHERE ID(p) = $post_id
+        UNWIND v.selected_options AS option
+        RETURN option, count(*) AS count
+        """
+        result = await self.neo4j_db.read_transaction(
+            self.neo4j_executor, cypher, {"post_id": post_id}
+        )
+        return {record["option"]: record["count"] for record in result or []}
+
     @staticmethod
     async def poll_expiration_checker(
         poll_created_at: float, poll_duration: PollDurations
@@ -304,6 +548,9 @@ class PostRepository(Base):
             user_avatar=avatar,
         )
 
+    async def refresh_user_info(self) -> None:
+        on_user_info_changed(await self.get_user_info())
+
     async def poll_options_process(
         self, post_node: dict
     ) -> list[PollOptionResult]:
@@ -313,6 +560,30 @@ class PostRepository(Base):
             for opt in post_node["options"]
         ]
 
+        # Closed polls have their counts frozen on the node, only the user's
+        # own choice has to be looked up
+        if post_node.get("result_counts") is not None:
+            cypher = """
+            MATCH (u:USER)-[v:VOTED]->(p:POST:POLL)
+            WHERE ID(p) = $post_id AND u.user_id = $user_id
+            RETURN v.selected_options AS chosen
+            """
+            params = {
+                "post_id": post_node.get("id", 0),
+                "user_id": str(self.user.id),
+            }
+            result = await self.neo4j_db.read_transaction(
+                self.neo4j_executor, cypher, params
+            )
+            chosen_titles = set(result[0]["chosen"]) if result else set()
+            result_counts = Post.construct(
+                **post_node
+            ).result_counts_by_option()
+            for element in return_options:
+                element.count = result_counts.get(element.title, 0)
+                element.chosen = element.title in chosen_titles
+            return return_options
+
         # Define the Cypher query to get counts of each selected option and
         # check which are chosen
         cypher = """
@@ -0,0 +1,59 @@
+"""Cypher statements of the write paths, built once per post type.
+
+Keeping the text of a statement fixed and passing everything else as
+parameters lets Neo4j reuse its cached query plan.
+"""
+from app.apps.feed.schemas.post import PostTypes
+
+# Polls only carry `closes_at` while they are open, so the range index on it
+# always holds just the open polls.
+CLOSES_AT_EXPRESSION = "p.created_at + p.duration * 86400"
+
+CREATE_POST = {
+    post_type: f"""
+    MATCH (u:USER)
+    WHERE u.user_id = $user_id
+    CREATE (p:POST:{post_type.value} $properties)
+    CREATE (p)-[r:CREATED_BY]->(u)
+    SET p.closes_at = CASE
+        WHEN p.duration IS NULL THEN null
+        ELSE {CLOSES_AT_EXPRESSION}
+    END
+    RETURN ID(p) AS id, p, labels(p)[1] AS type
+    """
+    for post_type in PostTypes
+}
+
+UPDATE_POST = {
+    post_type: f"""
+    MATCH (p:POST:{post_type.value})
+    WHERE
+    ID(p) = $post_id AND
+    p.user_id = $user_id AND
+    p.deleted_at IS NULL
+    SET p += $update_params
+    SET p.closes_at = CASE
+        WHEN p.duration IS NULL OR p.closed_at IS NOT NULL THEN null
+        ELSE {CLOSES_AT_EXPRESSION}
+    END
+    RETURN ID(p) AS id, p, labels(p)[1] AS type
+    """
+    for post_type in PostTypes
+}
+
+CREATE_COMMENT = """
+MATCH (p:POST), (u:USER)
+WHERE
+ID(p) = $post_id AND
+p.deleted_at IS NULL AND
+u.user_id = $user_id
+OPTIONAL MATCH (pc:COMMENT)
+WHERE ID(pc) = $parent_id
+CREATE (c:COMMENT $properties)
+CREATE (c)-[r1:BELONGS_TO]->(p)<-[r2:COMMENTED_ON]-(u),
+       (c)-[r3:COMMENT_BY]->(u)
+FOREACH (parent IN CASE WHEN pc IS NULL THEN [] ELSE [pc] END |
+    CREATE (c)-[r4:REPLY_ON]->(parent)
+)
+RETURN ID(c) AS id, c
+"""
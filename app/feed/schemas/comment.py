@@ -6,7 +6,7 @@ from app.schemas.base import ListWithCountResponse, Model
 
 
 class CommentUserInfo(BaseModel):
-    # TODO Signal: when user data changes, these have to change as well
+    # Kept in sync by `UserInfoPropagationJob`
     user_id: str
     user_display_name: str
     user_avatar: str | None
@@ -27,8 +27,28 @@ class PaginatedComments(ListWithCountResponse):
     data: list[CommentOutput]
 
 
+class SearchedComments(Model):
+    data: list[CommentOutput]
+    next_cursor: str | None = None
+
+
 class CommentsListParams:  # TODO inherit from base pagination from core_zenoa
-    def __init__(self, post_id: int, offset: int = 0, limit: int = 20):
+    def __init__(
+        self,
+        post_id: int,
+        offset: int = 0,
+        limit: int = 20,
+        fields: str | None = None,
+    ):
         self.post_id = post_id
         self.offset = offset
         self.limit = limit
+        # Comma separated output fields, all of them when omitted
+        self.fields = fields
+
+
+class CommentsSearchParams:
+    def __init__(self, q: str, cursor: str | None = None, limit: int = 20):
+        self.q = q
+        self.cursor = cursor
+        self.limit = limit
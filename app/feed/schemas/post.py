@@ -26,6 +26,11 @@ class PollDurations(int, Enum):
     TWO_WEEKS = 14
 
 
+class PostsSort(str, Enum):
+    LATEST = "latest"
+    HOT = "hot"
+
+
 class PollOption(Model):
     title: str  # TODO Validate uniqueness
 
@@ -75,7 +80,7 @@ PostInput = Annotated[
 
 
 class PostUserInfo(BaseModel):
-    # TODO Signal: when user data changes, these have to change as well
+    # Kept in sync by `UserInfoPropagationJob`
     user_id: str
     user_display_name: str
     user_headline: str | None
@@ -114,9 +119,36 @@ PostOutput = Annotated[
 
 class PaginatedPosts(ListWithCountResponse):
     data: list[PostOutput]
+    next_cursor: str | None = None
 
 
 class PostsListParams:  # TODO inherit from base pagination from core_zenoa
-    def __init__(self, offset: int = 0, limit: int = 20):
+    def __init__(
+        self,
+        offset: int = 0,
+        limit: int = 20,
+        sort: PostsSort = PostsSort.LATEST,
+        tag: str | None = None,
+        cursor: str | None = None,
+        fields: str | None = None,
+    ):
         self.offset = offset
         self.limit = limit
+        self.sort = sort
+        # Listing by tag is paginated by the cursor instead of the offset
+        self.tag = tag
+        self.cursor = cursor
+        # Comma separated output fields, all of them when omitted
+        self.fields = fields
+
+
+class SearchedPosts(Model):
+    data: list[PostOutput]
+    next_cursor: str | None = None
+
+
+class PostsSearchParams:
+    def __init__(self, q: str, cursor: str | None = None, limit: int = 20):
+        self.q = q
+        self.cursor = cursor
+        self.limit = limit
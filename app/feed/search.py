@@ -0,0 +1,213 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Iterator
+from enum import Enum
+
+from pydantic import BaseSettings
+
+from app.apps.base.pagination import encode_cursor
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Upper bound of the terms a single query prefix expands to
+MAX_PREFIX_EXPANSIONS = 50
+# Size the short list of new terms can reach before it is merged into the
+# sorted vocabulary, whatever the size of the vocabulary
+MIN_RECENT_TERMS = 1024
+LUCENE_SPECIAL_CHARACTERS = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+class SearchBackends(str, Enum):
+    NEO4J = "neo4j"
+    LOCAL = "local"
+
+
+class SearchSettings(BaseSettings):
+    # The local backend is meant for running without a Neo4j full-text index
+    SEARCH_BACKEND: SearchBackends = SearchBackends.NEO4J
+
+
+search_settings = SearchSettings()
+SEARCH_BACKEND = search_settings.SEARCH_BACKEND
+POST_FULLTEXT_INDEX = "post_content"
+COMMENT_FULLTEXT_INDEX = "comment_content"
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def next_search_cursor(
+    hits: list[tuple[float, int]], limit: int
+) -> str | None:
+    """Cursor after the last of the (score, id) hits of a full page."""
+    if len(hits) < limit:
+        return None
+    score, doc_id = hits[-1]
+    return encode_cursor({"score": score, "id": doc_id})
+
+
+def fulltext_query(text: str) -> str:
+    """Lucene query for a Neo4j full-text index, every term is a prefix."""
+    return " ".join(
+        LUCENE_SPECIAL_CHARACTERS.sub(r"\\\1", token) + "*"
+        for token in tokenize(text)
+    )
+
+
+class InvertedIndex:
+    """In-process inverted index ranking the documents with BM25.
+
+    The sorted vocabulary for the prefix lookups has two levels: new terms
+    go to the short `_recent_terms` list, which is merged into the large
+    one only once it holds a sixteenth of it, and removed terms stay
+    behind in `_removed_terms` until they outnumber the live ones. Adding a
+    term never shifts the whole vocabulary.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._postings: dict[str, dict[int, int]] = {}
+        self._documents: dict[int, Counter] = {}
+        self._lengths: dict[int, int] = {}
+        self._total_length = 0
+        self._vocabulary: list[str] = []
+        self._recent_terms: list[str] = []
+        self._removed_terms: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: int, text: str) -> None:
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self._documents[doc_id] = terms
+        self._lengths[doc_id] = terms.total()
+        self._total_length += self._lengths[doc_id]
+        for term, frequency in terms.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                if term in self._removed_terms:
+                    self._removed_terms.discard(term)
+                else:
+                    insort(self._recent_terms, term)
+            self._postings[term][doc_id] = frequency
+        if len(self._recent_terms) > max(
+            MIN_RECENT_TERMS, len(self._vocabulary) // 16
+        ):
+            # Timsort merges the two sorted runs in linear time
+            self._vocabulary.extend(self._recent_terms)
+            self._vocabulary.sort()
+            self._recent_terms = []
+
+    def remove(self, doc_id: int) -> None:
+        if (terms := self._documents.pop(doc_id, None)) is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                index = bisect_left(self._recent_terms, term)
+                if self._recent_terms[index : index + 1] == [term]:
+                    del self._recent_terms[index]
+                else:
+                    self._removed_terms.add(term)
+        if len(self._removed_terms) > len(self._postings):
+            self._vocabulary = [
+                term
+                for term in self._vocabulary
+                if term not in self._removed_terms
+            ]
+            self._removed_terms.clear()
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        after: tuple[float, int] | None = None,
+    ) -> list[tuple[float, int]]:
+        """Returns (score, doc_id) pairs, best first, that come after the
+        `after` pair."""
+        scores: dict[int, float] = {}
+        for token in tokenize(query):
+            for term in self._expand(token):
+                self._score_term(term, scores)
+
+        candidates = (
+            (-score, doc_id)
+            for doc_id, score in scores.items()
+            if after is None or (-score, doc_id) > (-after[0], after[1])
+        )
+        return [
+            (-negative_score, doc_id)
+            for negative_score, doc_id in heapq.nsmallest(limit, candidates)
+        ]
+
+    def _expand(self, prefix: str) -> list[str]:
+        terms = []
+        for term in heapq.merge(
+            self._terms_from(self._vocabulary, prefix),
+            self._terms_from(self._recent_terms, prefix),
+        ):
+            if not term.startswith(prefix):
+                break
+            if term in self._removed_terms:
+                continue
+            terms.append(term)
+            if len(terms) == MAX_PREFIX_EXPANSIONS:
+                break
+        return terms
+
+    @staticmethod
+    def _terms_from(terms: list[str], prefix: str) -> Iterator[str]:
+        for index in range(bisect_left(terms, prefix), len(terms)):
+            yield terms[index]
+
+    def _score_term(self, term: str, scores: dict[int, float]) -> None:
+        postings = self._postings[term]
+        documents_count = len(self._documents)
+        average_length = self._total_length / documents_count
+        idf = math.log(
+            1 + (documents_count - len(postings) + 0.5) / (len(postings) + 0.5)
+        )
+        for doc_id, frequency in postings.items():
+            length = self._lengths[doc_id]
+            scores[doc_id] = scores.get(doc_id, 0) + idf * (
+                frequency
+                * (self.k1 + 1)
+                / (
+                    frequency
+                    + self.k1
+                    * (1 - self.b + self.b * length / average_length)
+                )
+            )
+
+
+post_index = InvertedIndex()
+comment_index = InvertedIndex()
+
+
+def index_post(post_id: int, content: str) -> None:
+    if SEARCH_BACKEND == SearchBackends.LOCAL:
+        post_index.add(post_id, content)
+
+
+def unindex_post(post_id: int) -> None:
+    if SEARCH_BACKEND == SearchBackends.LOCAL:
+        post_index.remove(post_id)
+
+
+def index_comment(comment_id: int, content: str) -> None:
+    if SEARCH_BACKEND == SearchBackends.LOCAL:
+        comment_index.add(comment_id, content)
+
+
+def unindex_comment(comment_id: int) -> None:
+    if SEARCH_BACKEND == SearchBackends.LOCAL:
+        comment_index.remove(comment_id)
@@ -0,0 +1,31 @@
+from app.apps.base.tasks import task_queue
+from app.apps.feed.jobs.polls import (
+    POLLS_CLOSE_INTERVAL,
+    close_expired_polls,
+    prepare_polls,
+)
+from app.apps.feed.jobs.purge import (
+    PURGE_SWEEP_INTERVAL,
+    prepare_purge,
+    sweep_deleted_posts,
+)
+from app.apps.feed.jobs.ranking import (
+    HOT_RESCORE_INTERVAL,
+    prepare_hot_ranking,
+    rescore_hot_ranking,
+)
+from app.apps.feed.jobs.search import prepare_search
+from app.apps.feed.jobs.tags import prepare_tags
+
+
+async def initialize_feed() -> None:
+    task_queue.submit(prepare_search)
+    task_queue.submit(prepare_tags)
+    task_queue.submit(prepare_hot_ranking)
+    task_queue.submit(rescore_hot_ranking)
+    task_queue.submit(prepare_polls)
+    task_queue.submit(prepare_purge)
+    task_queue.submit(sweep_deleted_posts)
+    task_queue.every(HOT_RESCORE_INTERVAL, rescore_hot_ranking)
+    task_queue.every(POLLS_CLOSE_INTERVAL, close_expired_polls)
+    task_queue.every(PURGE_SWEEP_INTERVAL, sweep_deleted_posts)
@@ -0,0 +1,12 @@
+import re
+
+HASHTAG_PATTERN = re.compile(r"(?<![\w#])#(\w+)")
+MENTION_PATTERN = re.compile(r"(?<![\w@])@(\w+)")
+
+
+def extract_hashtags(content: str) -> list[str]:
+    return sorted({tag.lower() for tag in HASHTAG_PATTERN.findall(content)})
+
+
+def extract_mentions(content: str) -> list[str]:
+    return sorted(set(MENTION_PATTERN.findall(content)))
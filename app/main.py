@@ -1,13 +1,30 @@
+import re
+
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette_prometheus import PrometheusMiddleware, metrics
 
+from app.apps.base.compression import SelectiveCompressionMiddleware
+from app.apps.base.routing import close_router
+from app.apps.base.tasks import task_queue
+from app.apps.feed.startups import initialize_feed
 from app.core.router import router
 from app.core.settings import settings
 from app.core.startups import initialize_project
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli is optional, gzip is always available
+    BrotliMiddleware = None
+
+# Smaller responses aren't worth the compression
+COMPRESSION_MINIMUM_SIZE = 1024
+# Server-sent events have to reach the client as soon as they are written
+UNCOMPRESSED_PATHS = re.compile(r"/post/\d+/stream$")
+
 app = FastAPI(
     debug=settings.DEBUG,
     title=settings.PROJECT_NAME,
@@ -32,4 +49,25 @@ app.add_middleware(
 
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 
+if BrotliMiddleware is not None:
+    # Falls back to gzip for the clients that don't accept br
+    app.add_middleware(
+        SelectiveCompressionMiddleware,
+        compressor=BrotliMiddleware,
+        exclude=UNCOMPRESSED_PATHS,
+        minimum_size=COMPRESSION_MINIMUM_SIZE,
+        gzip_fallback=True,
+    )
+else:
+    app.add_middleware(
+        SelectiveCompressionMiddleware,
+        compressor=GZipMiddleware,
+        exclude=UNCOMPRESSED_PATHS,
+        minimum_size=COMPRESSION_MINIMUM_SIZE,
+    )
+
 app.add_event_handler("startup", initialize_project)
+app.add_event_handler("startup", task_queue.start)
+app.add_event_handler("startup", initialize_feed)
+app.add_event_handler("shutdown", task_queue.drain)
+app.add_event_handler("shutdown", close_router)
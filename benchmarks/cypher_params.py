@@ -0,0 +1,87 @@
+"""CPU time of building the create statement and its parameters, old way
+against the precompiled statements.
+
+Run with `poetry run python -m benchmarks.cypher_params`.
+"""
+import argparse
+import json
+import timeit
+
+from app.apps.base.cypher import to_cypher_params
+from app.apps.feed.models.post import Post
+from app.apps.feed.repository import statements
+from app.apps.feed.schemas.post import (
+    PollPostInput,
+    PostUserInfo,
+    TextPostInput,
+)
+
+USER_INFO = PostUserInfo(
+    user_id="64b7f0c2a1d3e4f5a6b7c8d9",
+    user_display_name="Jane Doe",
+    user_headline="Engineer",
+    user_avatar="https://example.com/avatar.png",
+)
+POSTS = {
+    "text": Post.from_input(
+        TextPostInput(content="Hello #world, this is @jane " * 8), USER_INFO
+    ),
+    "poll": Post.from_input(
+        PollPostInput.parse_obj(
+            {
+                "content": "Which one?",
+                "poll_settings": {
+                    "voting_type": "SINGLE_VOTE",
+                    "duration": 3,
+                    "options": [{"title": f"option {i}"} for i in range(5)],
+                },
+            }
+        ),
+        USER_INFO,
+    ),
+}
+
+
+def json_round_trip(post: Post) -> tuple[str, dict]:
+    # The statement and parameters create_post built before precompiling
+    cypher = f"""
+    MATCH (u:USER)
+    WHERE u.user_id = $user_id
+    CREATE (p:POST:{post.post_type} {{
+        {post.get_cypher_fields()}
+    }})
+    CREATE (p)-[r:CREATED_BY]->(u)
+    RETURN ID(p) AS id, p, labels(p)[1] AS type
+    """
+    return cypher, json.loads(post.json())
+
+
+def precompiled(post: Post) -> tuple[str, dict]:
+    return statements.CREATE_POST[post.post_type], {
+        "user_id": post.user_id,
+        "properties": to_cypher_params(post),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for name, post in POSTS.items():
+        # Both have to send the same values to Neo4j
+        assert precompiled(post)[1]["properties"] == json_round_trip(post)[1]
+        for build in (json_round_trip, precompiled):
+            seconds = min(
+                timeit.repeat(
+                    lambda: build(post), number=args.number, repeat=5
+                )
+            )
+            print(
+                f"{name:>5} post  {build.__name__:>15}  "
+                f"{seconds / args.number * 1e6:8.2f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
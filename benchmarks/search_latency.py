@@ -0,0 +1,118 @@
+"""Query latency of the local search backend over a synthetic corpus.
+
+Run with `poetry run python -m benchmarks.search_latency`, the defaults
+index one million posts.
+"""
+import argparse
+import itertools
+import random
+import statistics
+import string
+import time
+
+from app.apps.feed.search import InvertedIndex, tokenize
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add(
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        )
+    return sorted(words, key=lambda _: rng.random())
+
+
+def make_posts(
+    count: int, vocabulary: list[str], rng: random.Random
+) -> list[str]:
+    # Zipf distributed, like the words of real posts
+    cum_weights = list(
+        itertools.accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)
+        )
+    )
+    return [
+        " ".join(
+            rng.choices(
+                vocabulary, cum_weights=cum_weights, k=rng.randint(5, 40)
+            )
+        )
+        for _ in range(count)
+    ]
+
+
+def percentiles(samples: list[float]) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return (
+        f"p50 {cuts[49] * 1000:8.2f} ms  "
+        f"p95 {cuts[94] * 1000:8.2f} ms  "
+        f"p99 {cuts[98] * 1000:8.2f} ms"
+    )
+
+
+def measure(index: InvertedIndex, queries: list[str], limit: int) -> str:
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        hits = index.search(query, limit)
+        # The second page walks the same candidates past the cursor
+        if len(hits) == limit:
+            index.search(query, limit, after=hits[-1])
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    posts = make_posts(args.posts, vocabulary, rng)
+
+    index = InvertedIndex()
+    started = time.perf_counter()
+    for post_id, content in enumerate(posts):
+        index.add(post_id, content)
+    print(
+        f"indexed {len(index)} posts in "
+        f"{time.perf_counter() - started:.1f} s"
+    )
+
+    common = vocabulary[: args.vocabulary // 100]
+    rare = vocabulary[-args.vocabulary // 2 :]
+    workloads = {
+        "common term": [rng.choice(common) for _ in range(args.queries)],
+        "rare term": [rng.choice(rare) for _ in range(args.queries)],
+        "prefix": [rng.choice(vocabulary)[:3] for _ in range(args.queries)],
+        "three terms": [
+            " ".join(rng.choices(vocabulary[:1000], k=3))
+            for _ in range(args.queries)
+        ],
+        "sampled post": [
+            " ".join(tokenize(rng.choice(posts))[:5])
+            for _ in range(args.queries)
+        ],
+    }
+    # The first search pays for merging the vocabulary built while indexing
+    index.search(vocabulary[0], args.limit)
+    for name, queries in workloads.items():
+        print(f"{name:>12}  {measure(index, queries, args.limit)}")
+
+    # Steady state: every search follows a write that brings new terms
+    samples = []
+    for post_id in range(args.posts, args.posts + args.queries):
+        index.add(post_id, f"{rng.choice(posts)} fresh{post_id}")
+        started = time.perf_counter()
+        index.search(rng.choice(rare), args.limit)
+        samples.append(time.perf_counter() - started)
+    print(f"{'after write':>12}  {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
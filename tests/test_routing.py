@@ -0,0 +1,249 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+import pytest
+from neo4j import READ_ACCESS, WRITE_ACCESS, Bookmarks
+from neo4j.exceptions import TransientError
+
+from app.apps.base.routing import (
+    BOOKMARKS_SESSION_KEY,
+    Neo4jRouter,
+    RoutedNeo4jSession,
+)
+from app.apps.base.unit_of_work import UnitOfWork, gather
+
+
+class RecordingDriver:
+    """Stub of a Neo4j driver recording where the transactions were routed.
+
+    Every transaction appends a `(driver name, access mode, bookmarks)` tuple
+    to `decisions`, which can be shared by several drivers, and returns
+    `result` without touching a database. Each committed write hands out a
+    new bookmark.
+    """
+
+    def __init__(
+        self, name: str, decisions: list | None = None, result: Any = None
+    ):
+        self.name = name
+        self.decisions = decisions if decisions is not None else []
+        self.result = result
+        self._writes = 0
+
+    @asynccontextmanager
+    async def session(
+        self, default_access_mode: str, bookmarks: Bookmarks | None = None
+    ):
+        yield _RecordingSession(
+            self, default_access_mode, bookmarks or Bookmarks()
+        )
+
+    async def close(self) -> None:
+        pass
+
+
+class _RecordingSession:
+    def __init__(
+        self, driver: RecordingDriver, access_mode: str, bookmarks: Bookmarks
+    ):
+        self.driver = driver
+        self.access_mode = access_mode
+        self.bookmarks = bookmarks
+
+    async def read_transaction(
+        self, transaction_function: Callable, *args: Any, **kwargs: Any
+    ) -> Any:
+        self._record()
+        return self.driver.result
+
+    async def write_transaction(
+        self, transaction_function: Callable, *args: Any, **kwargs: Any
+    ) -> Any:
+        self._record()
+        self.driver._writes += 1
+        return self.driver.result
+
+    async def begin_transaction(self) -> "_RecordingTransaction":
+        self._record()
+        return _RecordingTransaction(self)
+
+    async def last_bookmarks(self) -> Bookmarks:
+        return Bookmarks.from_raw_values(
+            [f"{self.driver.name}:{self.driver._writes}"]
+        )
+
+    def _record(self) -> None:
+        self.driver.decisions.append(
+            (
+                self.driver.name,
+                self.access_mode,
+                sorted(self.bookmarks.raw_values),
+            )
+        )
+
+
+class _RecordingTransaction:
+    def __init__(self, session: _RecordingSession):
+        self.session = session
+        self.committed = False
+        self.closed = False
+
+    async def commit(self) -> None:
+        self.committed = True
+        self.session.driver._writes += 1
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def read_nothing(tx, *args: Any) -> Any:
+    return tx
+
+
+def test_reads_go_round_robin_over_the_replicas():
+    decisions: list = []
+    router = Neo4jRouter(
+        leader=RecordingDriver("leader", decisions),
+        replicas=[
+            RecordingDriver("replica-1", decisions),
+            RecordingDriver("replica-2", decisions),
+        ],
+    )
+    neo4j_db = RoutedNeo4jSession(router, {})
+
+    async def read_three_times():
+        for _ in range(3):
+            await neo4j_db.read_transaction(read_nothing)
+
+    asyncio.run(read_three_times())
+
+    assert decisions == [
+        ("replica-1", READ_ACCESS, []),
+        ("replica-2", READ_ACCESS, []),
+        ("replica-1", READ_ACCESS, []),
+    ]
+
+
+def test_reads_stay_on_the_leader_without_replicas():
+    decisions: list = []
+    router = Neo4jRouter(leader=RecordingDriver("leader", decisions))
+
+    asyncio.run(RoutedNeo4jSession(router, {}).read_transaction(read_nothing))
+
+    assert decisions == [("leader", READ_ACCESS, [])]
+
+
+def test_reads_wait_for_the_bookmarks_of_the_last_write():
+    decisions: list = []
+    router = Neo4jRouter(
+        leader=RecordingDriver("leader", decisions),
+        replicas=[RecordingDriver("replica", decisions)],
+    )
+    state: dict = {}
+    neo4j_db = RoutedNeo4jSession(router, state)
+
+    async def write_then_read():
+        await neo4j_db.write_transaction(read_nothing)
+        await neo4j_db.read_transaction(read_nothing)
+
+    asyncio.run(write_then_read())
+
+    assert state[BOOKMARKS_SESSION_KEY] == ["leader:1"]
+    assert decisions == [
+        ("leader", WRITE_ACCESS, []),
+        ("replica", READ_ACCESS, ["leader:1"]),
+    ]
+
+
+def test_unit_of_work_commits_one_leader_transaction_before_returning():
+    decisions: list = []
+    leader = RecordingDriver("leader", decisions)
+    state: dict = {BOOKMARKS_SESSION_KEY: ["leader:0"]}
+    side_effects: list = []
+
+    async def work(unit_of_work: UnitOfWork) -> str:
+        await unit_of_work.read_transaction(read_nothing)
+        await unit_of_work.write_transaction(read_nothing)
+        unit_of_work.after_commit(side_effects.append, "committed")
+        # Nothing runs before the commit
+        assert side_effects == []
+        return "done"
+
+    async def run_unit():
+        async with leader.session(
+            default_access_mode=WRITE_ACCESS,
+            bookmarks=Bookmarks.from_raw_values(state[BOOKMARKS_SESSION_KEY]),
+        ) as session:
+            unit_of_work = UnitOfWork(session, state)
+            return await unit_of_work.run(work, unit_of_work)
+
+    assert asyncio.run(run_unit()) == "done"
+    assert decisions == [("leader", WRITE_ACCESS, ["leader:0"])]
+    assert side_effects == ["committed"]
+    assert state[BOOKMARKS_SESSION_KEY] == ["leader:1"]
+
+
+def test_unit_of_work_runs_again_after_a_transient_error():
+    leader = RecordingDriver("leader")
+    state: dict = {}
+    side_effects: list = []
+    attempts: list = []
+
+    async def work(unit_of_work: UnitOfWork) -> None:
+        attempts.append(
+            await unit_of_work.write_transaction(read_nothing)
+        )
+        unit_of_work.after_commit(side_effects.append, len(attempts))
+        if len(attempts) == 1:
+            raise TransientError("deadlock detected")
+
+    async def run_unit():
+        async with leader.session(default_access_mode=WRITE_ACCESS) as session:
+            unit_of_work = UnitOfWork(session, state, retry_delay=0)
+            await unit_of_work.run(work, unit_of_work)
+
+    asyncio.run(run_unit())
+
+    first, second = attempts
+    assert first.closed and not first.committed
+    assert second.committed
+    # The side effects of the failed attempt are dropped
+    assert side_effects == [2]
+    assert state[BOOKMARKS_SESSION_KEY] == ["leader:1"]
+
+
+def test_failed_sibling_statement_does_not_outlive_the_unit_of_work():
+    decisions: list = []
+    leader = RecordingDriver("leader", decisions)
+    finished: list = []
+
+    async def slow_statement(tx) -> None:
+        await asyncio.sleep(0.05)
+        finished.append(tx)
+
+    async def not_found() -> None:
+        raise LookupError("User not found")
+
+    async def work(unit_of_work: UnitOfWork) -> None:
+        await gather(
+            unit_of_work.read_transaction(slow_statement),
+            unit_of_work.read_transaction(slow_statement),
+            not_found(),
+        )
+
+    async def run_unit():
+        async with leader.session(default_access_mode=WRITE_ACCESS) as session:
+            unit_of_work = UnitOfWork(session, {})
+            with pytest.raises(LookupError):
+                await unit_of_work.run(work, unit_of_work)
+            # Long enough for an orphaned statement to finish or begin a
+            # new transaction
+            await asyncio.sleep(0.1)
+            return unit_of_work
+
+    unit_of_work = asyncio.run(run_unit())
+
+    assert finished == []
+    assert unit_of_work._transaction is None
+    assert decisions == [("leader", WRITE_ACCESS, [])]
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+import uuid
+
+import pytest
+
+from app.apps.base.shared_cache import SharedCache
+
+
+@pytest.fixture
+def cache_name():
+    name = f"test-shared-cache-{uuid.uuid4().hex}"
+    yield name
+    path = SharedCache(name).path
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def test_miss_leases_the_slot_to_a_single_worker(cache_name):
+    # Two handles on one file stand for two worker processes
+    first, second = SharedCache(cache_name), SharedCache(cache_name)
+
+    assert first.lookup("page") == (None, True)
+    assert second.lookup("page") == (None, False)
+
+    first.store("page", b"value", first.generation())
+    assert second.lookup("page") == (b"value", False)
+
+
+def test_concurrent_misses_compute_once(cache_name):
+    caches = [SharedCache(cache_name) for _ in range(5)]
+    computed = []
+
+    async def compute() -> bytes:
+        computed.append(None)
+        await asyncio.sleep(0.1)
+        return b"value"
+
+    async def fetch_all():
+        return await asyncio.gather(
+            *(cache.get_or_compute("page", compute) for cache in caches)
+        )
+
+    assert asyncio.run(fetch_all()) == [b"value"] * 5
+    assert len(computed) == 1
+
+
+def test_stale_value_is_served_while_one_worker_refreshes(cache_name):
+    first = SharedCache(cache_name, fresh_for=0)
+    second = SharedCache(cache_name, fresh_for=0)
+    first.store("page", b"old", first.generation())
+
+    assert first.lookup("page") == (b"old", True)
+    assert second.lookup("page") == (b"old", False)
+
+    first.store("page", b"new", first.generation())
+    assert second.lookup("page") == (b"new", True)
+
+
+def test_invalidate_turns_the_value_stale(cache_name):
+    cache = SharedCache(cache_name)
+    cache.store("page", b"old", cache.generation())
+    cache.invalidate()
+
+    assert cache.lookup("page") == (b"old", True)
+
+
+def test_oversized_value_releases_the_lease(cache_name):
+    cache = SharedCache(cache_name, slot_size=1024, fill_wait=2)
+    computed = []
+
+    async def compute() -> bytes:
+        computed.append(None)
+        return b"x" * 5000
+
+    started = time.monotonic()
+    for _ in range(3):
+        assert asyncio.run(cache.get_or_compute("page", compute)) == (
+            b"x" * 5000
+        )
+
+    assert len(computed) == 3
+    assert time.monotonic() - started < 1
+
+
+def test_failed_compute_releases_the_lease(cache_name):
+    cache = SharedCache(cache_name, fill_wait=2)
+
+    async def fail() -> bytes:
+        raise RuntimeError("database is down")
+
+    async def compute() -> bytes:
+        return b"value"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("page", fail))
+
+    started = time.monotonic()
+    assert asyncio.run(cache.get_or_compute("page", compute)) == b"value"
+    assert time.monotonic() - started < 1
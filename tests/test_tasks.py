@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from app.apps.base.tasks import TaskQueue
+
+
+async def do_nothing() -> None:
+    pass
+
+
+def test_submit_reports_whether_the_task_was_queued():
+    async def submit_three():
+        task_queue = TaskQueue(concurrency=1, max_size=1)
+        await task_queue.start()
+        # The worker only picks a task up at the next await
+        queued = [task_queue.submit(do_nothing) for _ in range(3)]
+        await task_queue.drain()
+        return queued
+
+    assert asyncio.run(submit_three()) == [True, False, False]
+
+
+def test_submit_refuses_tasks_once_drained():
+    async def submit_after_drain():
+        task_queue = TaskQueue()
+        await task_queue.start()
+        await task_queue.drain()
+        task_queue.submit(do_nothing)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(submit_after_drain())